@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Compares twitter_to_datetime() with the pd.to_datetime(format = ...) call
+file_json_pandas() used to make, on Twitter-style created_at strings.
+
+    python benchmarks/bench_dates.py [rows]
+
+Two cases are timed: tweet_created_at (nearly every value distinct) and
+user_created (a limited pool of users showing up again and again).
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import effort as eff
+
+
+def twitter_strings(n, distinct, seed = 0):
+    rng = np.random.default_rng(seed)
+    stamps = pd.to_datetime(rng.integers(1.2e9, 1.6e9, size = distinct), 
+                            unit = 's')
+    pool = stamps.strftime("%a %b %d %H:%M:%S +0000 %Y").to_numpy(dtype = object)
+    return pd.Series(pool[rng.integers(0, distinct, size = n)])
+
+
+def best_of(func, values, repeat = 3):
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(values)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n = 1000000):
+    cases = {'tweet_created_at' : twitter_strings(n, n),
+             'user_created' : twitter_strings(n, max(1, n // 50))}
+    
+    for name, values in cases.items():
+        old = lambda v: pd.to_datetime(v, format = eff._TWITTER_DATE_FORMAT)
+        assert (old(values).astype('datetime64[ns]')
+                == eff.twitter_to_datetime(values)).all()
+        
+        old_time = best_of(old, values)
+        new_time = best_of(eff.twitter_to_datetime, values)
+        print(name + ": " + repr(n) + " rows, "
+              + repr(values.nunique()) + " distinct")
+        print("    pd.to_datetime:      %.3f s" % old_time)
+        print("    twitter_to_datetime: %.3f s (%.1fx)" 
+              % (new_time, old_time / new_time))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
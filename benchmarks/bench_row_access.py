@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the per-row data.loc[label, column] lookups that remove_duplicates(),
+trigram_transform() and top_tweets() used to make with pulling each column
+out once and going through it by position, as they do now.
+
+    python benchmarks/bench_row_access.py [rows]
+
+Three cases are timed on a frame indexed by tweet ID (as remove_duplicates()
+leaves it): reading the parsed column a row at a time, reading the parsed
+and text columns of every 25th row (matched tweets), and top_tweets() as a
+whole.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import effort as eff
+
+
+def tweet_frame(n, k, seed = 0):
+    rng = np.random.default_rng(seed)
+    ids = (10 ** 17 + rng.choice(10 ** 12, size = n, replace = False)).astype(str)
+    dists = rng.dirichlet(np.ones(k) * .1, size = n)
+    data = pd.DataFrame({'tweet_id' : ids,
+                         'tweet_text' : ['tweet ' + i for i in ids],
+                         'parsed' : [object() for _ in range(n)],
+                         'k_' + str(k) + '_topic_dist' : 
+                             [list(enumerate(row.tolist())) for row in dists]})
+    return data.set_index('tweet_id', drop = False)
+
+
+def old_top_tweets(data, k, top_n = 10):
+    colname = 'k_' + str(k) + '_topic_dist'
+    all_scores = [list() for topic in range(0, int(k))]
+    data.apply(lambda x: eff.topic_to_dict(topic_dist = x.loc[colname],
+                                           all_scores = all_scores,
+                                           tweet_id = x.loc['tweet_id']),
+               axis = 1)
+    final_scores = list()
+    for topic in all_scores:
+        topic = sorted(topic, key = lambda x: -x[1])
+        final_scores.append(topic[0:top_n])
+    top_tweets = list()
+    for topic in final_scores:
+        top_tweets.append([[data.loc[i[0], 'tweet_id'], 
+                            data.loc[i[0], 'tweet_text']] for i in topic])
+    return list([final_scores, top_tweets])
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def report(name, old_time, new_time):
+    print(name)
+    print("    data.loc per row: %.3f s" % old_time)
+    print("    by position:      %.3f s (%.1fx)" 
+          % (new_time, old_time / new_time))
+
+
+def main(n = 1000000, k = 20):
+    data = tweet_frame(n, k)
+    ids = data.index.tolist()
+    matched = ids[::25]
+    positions = list(range(0, n, 25))
+    print(repr(n) + " rows")
+    
+    old, old_time = timed(lambda: [data.loc[i, 'parsed'] for i in ids])
+    new, new_time = timed(lambda: data['parsed'].tolist())
+    assert all(a is b for a, b in zip(old, new))
+    report("parsed column, every row", old_time, new_time)
+    
+    def by_position():
+        parsed = data['parsed'].tolist()
+        texts = data['tweet_text'].tolist()
+        return [(parsed[i], texts[i]) for i in positions]
+    
+    old, old_time = timed(lambda: [(data.loc[i, 'parsed'], 
+                                    data.loc[i, 'tweet_text']) 
+                                   for i in matched])
+    new, new_time = timed(by_position)
+    assert old == new
+    report("parsed and text, every 25th row", old_time, new_time)
+    
+    old, old_time = timed(lambda: old_top_tweets(data, k))
+    new, new_time = timed(lambda: eff.top_tweets(data, k))
+    assert old == new
+    report("top_tweets(), k = " + repr(k), old_time, new_time)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
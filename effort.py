@@ -14,9 +14,22 @@ Functions included:
     file_json_pandas()
         Takes a single JSON file and returns a pandas DataFrame.
         
+    file_json_pandas_chunks()
+        Streams a single (large) JSON file as pandas DataFrames of a fixed
+        number of tweets.
+        
     folder_json_pandas()
-        Takes a folder path of JSON files, imports them, and returns a
-        pandas DataFrame.
+        Takes a folder path of JSON files, imports them (in parallel), and
+        returns a pandas DataFrame.
+        
+    pandas_parquet() / parquet_pandas()
+        Saves imported tweets to a date-partitioned Parquet store and reads
+        back only the columns and days asked for.
+        *   Requires pyarrow: https://arrow.apache.org
+        
+    folder_json_parquet()
+        Adds only new or changed JSON files in a folder to the Parquet store,
+        keeping a manifest of what has already been imported.
         
     remove_duplicates()
         Takes imported Twitter data (pandas DF) and removes duplicate tweets,
@@ -24,292 +37,559 @@ Functions included:
         *   Requires spaCy (v. 1.9.0): https://spacy.io
                 **spaCy 2.0+ is radically different and will not work yet.
         *** Possibly time-intensive. A small dataset (10,000) finishes in 
-            seconds. A medium-sized dataset (600,000) takes about 10 hours.
+            seconds. Similarities are worked out in blocks with matrix
+            multiplication, so a medium-sized dataset (600,000) takes 
+            minutes rather than the ~10 hours it used to.
             Set logger for progress reporting.
+        *   method = "minhash" only catches copy-and-paste duplicates, but
+            doesn't need spaCy and is much faster still.
+            
+    remove_duplicates_stream()
+        remove_duplicates() for tweets that keep coming in: each new batch
+        is checked against a saved (memory-mapped) state of earlier batches
+        rather than all of history being compared again.
             
     topic_model()    
+    
+    lda_k_sweep()
+        Trains and scores LDA models for a list of k (numbers of topics), 
+        several at once, splitting a budget of CPU cores between them.
+        search = "halving" drops the clearly worse k after a few passes
+        rather than training every one of them all the way.
+    
+    stage_report() / add_stage_callback()
+        Every stage above records its wall time, items/sec, and peak memory.
+        Get them as a (JSON) report for the run or have them sent to a
+        function as each stage finishes.
 
 """
 
-def file_json_pandas(json_file):
+'''
+Instrumentation
+'''
+
+# every finished stage of this run (see _Stage), and who wants to hear of them
+_stage_records = list()
+_stage_callbacks = list()
+
+
+def add_stage_callback(callback):
     """
-    Takes in a single JSON file and returns a pandas DataFrame. Option to 
-    pickle or CSV.
-    
-    json_file: (str)
-        Full location of JSON file. No default.
-            e.g., json_file = "C:\\Users\\nwalker\\data\\filename.json"
+    Has callback(record) called every time a stage of the pipeline (e.g.,
+    spacy_parse(), remove_duplicates(), lda_k_finder()) finishes. record is
+    a dict:
+        stage: (str) name of the function
+        started: (str) when it started, ISO 8601 (UTC)
+        seconds: (float) wall time
+        items: (int) number of things it went through
+        unit: (str) what those things are, e.g., "tweets"
+        items_per_sec: (float)
+        peak_rss_mb: (float) peak memory (resident set size) of this process
+            or any of its worker processes so far, None where the OS can't
+            say (Windows)
+    plus anything particular to the stage (e.g., k for lda_k_finder()).
+    Each record is also logged at INFO level, with the dict as the log 
+    record's 'stage' attribute.
+        e.g., add_stage_callback(lambda record: print(record['stage']))
+    """
+    _stage_callbacks.append(callback)
+
+
+def remove_stage_callback(callback):
+    """
+    Stops calling a callback given to add_stage_callback().
+    """
+    if callback in _stage_callbacks:
+        _stage_callbacks.remove(callback)
+
+
+def stage_report(filepath = None, clear = False):
+    """
+    Timing report of every stage that has finished in this run (see 
+    add_stage_callback() for what's in each), in the order they finished.
+    Stages that call other stages (e.g., remove_duplicates() parsing with
+    spacy_parse()) include their time.
     
-    pickle_out: (str)
-        Desired pickled filename. Defaults to None (no output).
-            e.g., pickleout="tweetdf.txt"
+    filepath: (str)
+        Where to save the report as JSON. Defaults to None (not saved).
+            e.g., filepath = "timing_report.json"
             
-    csv_out: (str)
-        Desired CSV filename. Defaults to None (no output).
-            e.g., csvout="tweetdf.csv"
+    clear: (bool)
+        Start a new report once this one is made. Defaults to False.
     
-    Returns: pandas DataFrame
+    returns list of dicts
     """
-
-    import pandas as pd
     import json
-    import re
     
+    report = [dict(record) for record in _stage_records]
+    
+    if filepath is not None:
+        with open(filepath, 'w', encoding = 'utf-8') as file:
+            json.dump({'stages' : report}, file, indent = 1)
+    if clear:
+        del _stage_records[:]
+    
+    return report
+
+
+def _peak_rss_mb():
+    """
+    Peak resident set size (MB) of this process or its largest child, or 
+    None if the resource module isn't there (Windows).
+    """
+    import sys
+    try:
+        import resource
+    except ImportError:
+        return None
+    
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    
+    # bytes on macOS, KB everywhere else
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+class _Stage(object):
+    """
+    Times one run of a pipeline stage. Make it when the stage starts, add()
+    to its item count as it goes (or pass the count to done()), and call 
+    done() at the end, which records, logs, and hands the result to the
+    stage callbacks. Also works as a context manager.
+        e.g., stage = _Stage('spacy_parse', unit = 'tweets')
+              ...
+              stage.done(len(tweets))
+    """
+    
+    def __init__(self, name, unit = 'items', **info):
+        import datetime
+        import time
+        
+        self.name = name
+        self.unit = unit
+        self.info = info
+        self.items = 0
+        self.started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.start = time.time()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.done()
+        return False
+    
+    def add(self, count = 1):
+        self.items += count
+    
+    def seconds(self):
+        import time
+        return time.time() - self.start
     
+    def done(self, items = None, **info):
+        import logging
+        import numpy as np
+        
+        if items is not None:
+            self.items = items
+        seconds = max(self.seconds(), 1e-9)
+        
+        record = {'stage' : self.name,
+                  'started' : self.started,
+                  'seconds' : round(seconds, 3),
+                  'items' : int(self.items),
+                  'unit' : self.unit,
+                  'items_per_sec' : round(self.items / seconds, 1),
+                  'peak_rss_mb' : _peak_rss_mb()}
+        record.update(self.info)
+        record.update(info)
+        
+        # numpy numbers (e.g., k from np.arange()) as plain Python ones, so 
+        # the record can go into stage_report()'s JSON
+        for key, value in record.items():
+            if isinstance(value, np.generic):
+                record[key] = value.item()
+        _stage_records.append(record)
+        
+        logging.getLogger().info(
+            self.name + ": " + repr(record['items']) + " " + self.unit 
+            + " in " + "%.2f" % seconds + " seconds (" 
+            + "%.0f" % record['items_per_sec'] + " " + self.unit + "/sec"
+            + ("" if record['peak_rss_mb'] is None 
+               else ", peak RSS " + "%.0f" % record['peak_rss_mb'] + " MB")
+            + ")",
+            extra = {'stage' : record})
+        
+        for callback in list(_stage_callbacks):
+            callback(record)
+        
+        return record
+
+
+_TWEET_COLUMNS = ("tweet_id",
+                  "tweet_created_at",
+                  "tweet_text",
+                  "tweet_favorite_count",
+                  "tweet_retweet_count",
+                  "tweet_in_reply_to_screen_name",
+                  "tweet_in_reply_to_status_id_str",
+                  "tweet_in_reply_to_user_id_str",
+                  "tweet_hashtags",
+                  "tweet_urls",
+                  "tweet_mentions_id",
+                  "tweet_mentions_name",
+                  "tweet_mentions_screen_name",
+                  "tweet_media_url",
+                  "tweet_media_type",
+                  "user_created",
+                  "user_description",
+                  "user_description_url",
+                  "user_favorites_count",
+                  "user_followers_count",
+                  "user_friends_count",
+                  "user_id",
+                  "user_name",
+                  "user_screen_name",
+                  "user_verified",
+                  "rt_tweet_id",
+                  "rt_tweet_text",
+                  "rt_tweet_created_at",
+                  "rt_tweet_favorite_count",
+                  "rt_tweet_retweet_count",
+                  "rt_tweet_in_reply_to_screen_name",
+                  "rt_tweet_in_reply_to_status_id_str",
+                  "rt_tweet_in_reply_to_user_id_str",
+                  "rt_user_id",
+                  "rt_user_description",
+                  "rt_user_description_url",
+                  "rt_user_favorites_count",
+                  "rt_user_followers_count",
+                  "rt_user_created_at",
+                  "rt_user_name",
+                  "rt_user_screen_name",
+                  "rt_user_verified")
+
+
+def _iter_json_tweets(json_file, read_size = 1 << 20):
+    """
+    Generator that yields one tweet (dict) at a time from json_file. The file
+    can either be a single JSON array of tweets or JSON-lines (one tweet per
+    line). Only read_size characters plus the tweet currently being decoded
+    are held in memory, so this works on files much larger than RAM.
+
+    json_file: (str)
+        Full location of JSON file.
+
+    read_size: (int)
+        Number of characters read from disk at a time. Defaults to 1MB.
+
+    returns generator of dicts
+    """
+    import json
+
+    decoder = json.JSONDecoder()
+
     with open(json_file, "r", encoding = "utf-8") as file:
-        tweet_data = json.load(file)
-     
-    df = pd.DataFrame(
-        {
-        "tweet_id" : [
-            tweet['id_str'] 
-            for tweet in tweet_data
-            ],
-            #for each row in tweet_data, select the 'id_str'
-        "tweet_created_at" : [
-            tweet['created_at'] 
-            for tweet in tweet_data
-            ],
-        "tweet_text" : [
-            tweet['text'] 
-            for tweet in tweet_data
-            ],
-        "tweet_favorite_count" : [
-            tweet['favorite_count'] 
-            for tweet in tweet_data
-            ],
-        "tweet_retweet_count" : [
-            tweet['retweet_count'] 
-            for tweet in tweet_data
-            ],
-        "tweet_in_reply_to_screen_name" : [ 
-            tweet['in_reply_to_screen_name'] 
-            for tweet in tweet_data
-            ],
-        "tweet_in_reply_to_status_id_str" : [
-            tweet['in_reply_to_status_id_str'] 
-            for tweet in tweet_data
-            ],
-        "tweet_in_reply_to_user_id_str" : [
-            tweet['in_reply_to_user_id_str'] 
-            for tweet in tweet_data
-            ],
-        "tweet_hashtags" : [
-            [item['text'] 
-            for item in item_list] 
-                for item_list in [tweet.get('entities').get('hashtags') 
-                    for tweet in tweet_data]
-            ],
-            # for each row in tweet_data, select 'entities' then 'hashtags'
-                # for each item in 'hashtags', select the dictionary
-                    # in each dictionary, select 'text'
-                        # add it to the list
-        "tweet_urls" : [
-            [item['expanded_url'] 
-                for item in item_list] 
-                    for item_list in [tweet.get('entities').get('urls') 
-                        for tweet in tweet_data]
-            ],
-        "tweet_mentions_id" : [
-            [item['id_str'] 
-                for item in item_list] 
-                    for item_list in [tweet.get('entities').get('user_mentions') 
-                        for tweet in tweet_data]
-            ],
-        "tweet_mentions_name" : [
-            [item['name'] 
-            for item in item_list] 
-                for item_list in [tweet.get('entities').get('user_mentions') 
-                    for tweet in tweet_data]
-            ],
-        "tweet_mentions_screen_name" : [
-            [item['screen_name'] 
-            for item in item_list] 
-                for item_list in [tweet.get('entities').get('user_mentions') 
-                    for tweet in tweet_data]
-            ],
-        "tweet_media_url" : [
-            [item['expanded_url'] 
-            for item in item_list] 
-                for item_list in [tweet.get('extended_entities').get('media') 
-                if tweet.get('extended_entities') is not None 
-                else '' 
-                    for tweet in tweet_data]
-            ],
-                 # for each row in tweet_data, select 'extended_entities' then 
-                 #'media', but only attempt if 'extended_entities' exists
-                     #for each item in 'media', select the dictionary
-                         # in each dictionary, select 'expanded_url'
-                             # add it to the list
-        "tweet_media_type" : [
-            [item['type'] 
-            for item in item_list] 
-                for item_list in [tweet.get('extended_entities').get('media') 
-                if tweet.get('extended_entities') is not None 
-                else '' 
-                    for tweet in tweet_data]
-            ],
-        "user_created" : [
-            tweet.get('user').get('created_at') 
-                for tweet in tweet_data
-            ],
-        "user_description" : [
-            tweet.get('user').get('description') 
-                for tweet in tweet_data
-            ],
-        "user_description_url" : [
-            [item['expanded_url'] 
-            for item in item_list] 
-                for item_list in [
-                        tweet.get('user').get('entities')
-                            .get('url').get('urls') 
-                        if tweet.get('user').get('entities')
-                            .get('url') is not None 
-                        else '' 
-                            for tweet in tweet_data]
-            ],
-                 # for each row in tweet_data, select 'user' then 'entities' then 'url', but only attemtp if 'url' exists
-                     # for each item in 'url', select the dictionary
-                         # in each dictionary, select 'expanded_url'
-                             # add it to the list
-        "user_favorites_count" : [
-            tweet.get('user').get('favourites_count') 
-            for tweet in tweet_data
-            ],
-        "user_followers_count" : [
-            tweet.get('user').get('followers_count') 
-            for tweet in tweet_data
-            ],
-        "user_friends_count" : [
-            tweet.get('user').get('friends_count') 
-            for tweet in tweet_data
-            ],
-        "user_id" : [
-            tweet.get('user').get('id_str') 
-            for tweet in tweet_data
-            ],
-        "user_name" : [
-            tweet.get('user').get('name') 
-            for tweet in tweet_data
-            ],
-        "user_screen_name" : [
-            tweet.get('user').get('screen_name') 
-            for tweet in tweet_data
-            ],
-        "user_verified" : [
-            tweet.get('user').get('verified') 
-            for tweet in tweet_data
-            ],
-        "rt_tweet_id" : [
-            tweet.get('retweeted_status').get('id_str') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_tweet_text" : [
-            tweet.get('retweeted_status').get('text') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_tweet_created_at" : [
-            tweet.get('retweeted_status').get('created_at') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_tweet_favorite_count" : [
-            tweet.get('retweeted_status').get('favorite_count') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_tweet_retweet_count" : [
-            tweet.get('retweeted_status').get('retweet_count') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_tweet_in_reply_to_screen_name" : [
-            tweet.get('retweeted_status').get('in_reply_to_screen_name') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_tweet_in_reply_to_status_id_str" : [
-            tweet.get('retweeted_status').get('in_reply_to_status_id_str') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_tweet_in_reply_to_user_id_str" : [
-            tweet.get('retweeted_status').get('in_reply_to_user_id_str') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_id" : [
-            tweet.get('retweeted_status').get('user').get('id_str') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_description" : [
-            tweet.get('retweeted_status').get('user').get('description') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_description_url" :  [
-            [item['expanded_url'] 
-                for item in item_list] 
-                    for item_list in [
-                            tweet.get('retweeted_status').get('user')
-                                .get('entities').get('url').get('urls') 
-                            if tweet.get('retweeted_status') is not None 
-                            and tweet.get('retweeted_status').get('user')
-                                .get('entities').get('url') is not None 
-                            else '' 
-                                for tweet in tweet_data]
-            ],
-        "rt_user_favorites_count" : [
-            tweet.get('retweeted_status').get('user').get('favourites_count') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_followers_count" : [
-            tweet.get('retweeted_status').get('user').get('followers_count') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_created_at" : [
-            tweet.get('retweeted_status').get('user').get('created_at') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_name" : [
-            tweet.get('retweeted_status').get('user').get('name') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_screen_name" : [
-            tweet.get('retweeted_status').get('user').get('screen_name') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ],
-        "rt_user_verified" : [
-            tweet.get('retweeted_status').get('user').get('verified') 
-            if tweet.get('retweeted_status') is not None 
-            else '' 
-                for tweet in tweet_data
-            ]             
-        }
-    )
+        buffer = file.read(read_size)
+        pos = 0
+        eof = not buffer
+
+        while True:
+            # skip whitespace and the array brackets/commas between tweets
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n[],':
+                pos += 1
+
+            if pos == len(buffer):
+                if eof:
+                    return
+                buffer = file.read(read_size)
+                pos = 0
+                eof = not buffer
+                continue
+
+            try:
+                tweet, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # most likely the tweet runs past the end of the buffer --
+                # read more and try again. If there is no more, it's broken.
+                if eof:
+                    raise
+                more = file.read(read_size)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            yield tweet
+
+
+def _tweet_row(tweet):
+    """
+    Pulls every field used by file_json_pandas() out of a single tweet (dict)
+    in one pass. Returns a tuple in the same order as _TWEET_COLUMNS.
+    """
+    entities = tweet.get('entities')
+    mentions = entities.get('user_mentions')
+
+    # only attempt 'media' if 'extended_entities' exists
+    extended_entities = tweet.get('extended_entities')
+    if extended_entities is not None:
+        media = extended_entities.get('media') or []
+    else:
+        media = []
+
+    # only attempt 'urls' if 'url' exists
+    user = tweet.get('user')
+    user_url = user.get('entities').get('url')
+    if user_url is not None:
+        user_urls = user_url.get('urls')
+    else:
+        user_urls = []
+
+    row = (tweet['id_str'],
+           tweet['created_at'],
+           tweet['text'],
+           tweet['favorite_count'],
+           tweet['retweet_count'],
+           tweet['in_reply_to_screen_name'],
+           tweet['in_reply_to_status_id_str'],
+           tweet['in_reply_to_user_id_str'],
+           [item['text'] for item in entities.get('hashtags')],
+           [item['expanded_url'] for item in entities.get('urls')],
+           [item['id_str'] for item in mentions],
+           [item['name'] for item in mentions],
+           [item['screen_name'] for item in mentions],
+           [item['expanded_url'] for item in media],
+           [item['type'] for item in media],
+           user.get('created_at'),
+           user.get('description'),
+           [item['expanded_url'] for item in user_urls],
+           user.get('favourites_count'),
+           user.get('followers_count'),
+           user.get('friends_count'),
+           user.get('id_str'),
+           user.get('name'),
+           user.get('screen_name'),
+           user.get('verified'))
+
+    rt = tweet.get('retweeted_status')
+    if rt is None:
+        return row + (None, None, None, None, None, None, None, None, None,
+                      None,
+                      [],
+                      None, None, None, None, None, None)
+
+    rt_user = rt.get('user')
+    rt_user_url = rt_user.get('entities').get('url')
+    if rt_user_url is not None:
+        rt_user_urls = rt_user_url.get('urls')
+    else:
+        rt_user_urls = []
+
+    return row + (rt.get('id_str'),
+                  rt.get('text'),
+                  rt.get('created_at'),
+                  rt.get('favorite_count'),
+                  rt.get('retweet_count'),
+                  rt.get('in_reply_to_screen_name'),
+                  rt.get('in_reply_to_status_id_str'),
+                  rt.get('in_reply_to_user_id_str'),
+                  rt_user.get('id_str'),
+                  rt_user.get('description'),
+                  [item['expanded_url'] for item in rt_user_urls],
+                  rt_user.get('favourites_count'),
+                  rt_user.get('followers_count'),
+                  rt_user.get('created_at'),
+                  rt_user.get('name'),
+                  rt_user.get('screen_name'),
+                  rt_user.get('verified'))
+
+
+_TWEET_DATE_COLUMNS = ("tweet_created_at",
+                       "user_created",
+                       "rt_tweet_created_at",
+                       "rt_user_created_at")
+
+_TWEET_ID_COLUMNS = ("tweet_id",
+                     "user_id")
+
+_TWEET_NULLABLE_ID_COLUMNS = ("tweet_in_reply_to_status_id_str",
+                              "tweet_in_reply_to_user_id_str",
+                              "rt_tweet_id",
+                              "rt_tweet_in_reply_to_status_id_str",
+                              "rt_tweet_in_reply_to_user_id_str",
+                              "rt_user_id")
+
+_TWEET_COUNT_COLUMNS = ("tweet_favorite_count",
+                        "tweet_retweet_count",
+                        "user_favorites_count",
+                        "user_followers_count",
+                        "user_friends_count",
+                        "rt_tweet_favorite_count",
+                        "rt_tweet_retweet_count",
+                        "rt_user_favorites_count",
+                        "rt_user_followers_count")
+
+_TWEET_FLAG_COLUMNS = ("user_verified",
+                       "rt_user_verified")
+
+_TWEET_CATEGORY_COLUMNS = ("user_screen_name",
+                           "rt_user_screen_name",
+                           "tweet_media_type_str")
+
+_TWEET_TEXT_COLUMNS = ("tweet_text",
+                       "rt_tweet_text",
+                       "rt_user_description",
+                       "user_description")
+
+_TWEET_LIST_COLUMNS = ("tweet_hashtags",
+                       "tweet_urls",
+                       "tweet_mentions_id",
+                       "tweet_mentions_name",
+                       "tweet_mentions_screen_name",
+                       "tweet_media_url",
+                       "tweet_media_type",
+                       "user_description_url",
+                       "rt_user_description_url")
+
+
+_TWITTER_DATE_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+_TWITTER_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def twitter_to_datetime(values):
+    """
+    Converts Twitter's created_at strings, which always look like
+        "Tue Oct 31 14:32:40 +0000 2017"
+    to pandas datetimes. Same result as pd.to_datetime(values, format =
+    "%a %b %d %H:%M:%S +0000 %Y"), but much faster on large data:
+        * each distinct string is only parsed once (the same users'
+          user_created dates show up over and over), and
+        * the fixed-width layout is read straight out of the bytes with numpy
+          instead of going through strptime.
+    Anything that doesn't fit the layout falls back to pd.to_datetime().
+    
+    values: (pandas Series, list, or array of str)
+        Twitter date strings. Missing values (None/NaN) become NaT.
+        
+    returns pandas Series (if given a Series, with the same index) or 
+        DatetimeIndex
+    """
+    import numpy as np
+    import pandas as pd
+    
+    codes, uniques = pd.factorize(np.asarray(values, dtype = object))
+    uniques = np.asarray(uniques, dtype = object)
+    
+    try:
+        # one extra byte, so that strings that are too long can be spotted
+        raw = np.asarray(uniques, dtype = 'S31')
+    except UnicodeEncodeError:
+        raw = None
+    
+    if raw is not None and len(raw):
+        chars = raw.view(np.uint8).reshape(-1, 31).astype(np.int64)
+        digits = chars - ord('0')
+        
+        day = digits[:, 8] * 10 + digits[:, 9]
+        hour = digits[:, 11] * 10 + digits[:, 12]
+        minute = digits[:, 14] * 10 + digits[:, 15]
+        second = digits[:, 17] * 10 + digits[:, 18]
+        year = (digits[:, 26] * 1000 + digits[:, 27] * 100 
+                + digits[:, 28] * 10 + digits[:, 29])
+        
+        month_keys = np.array([(ord(m[0]) << 16) + (ord(m[1]) << 8) + ord(m[2])
+                               for m in _TWITTER_MONTHS])
+        month_order = np.argsort(month_keys)
+        key = (chars[:, 4] << 16) + (chars[:, 5] << 8) + chars[:, 6]
+        found = np.searchsorted(month_keys, key, sorter = month_order)
+        found = month_order[np.minimum(found, 11)]
+        month = found + 1
+        
+        # days in the month, leap years included
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        month_days = (np.array([31, 28, 31, 30, 31, 30, 
+                                31, 31, 30, 31, 30, 31])[found]
+                      + ((month == 2) & leap))
+        
+        number_cols = [8, 9, 11, 12, 14, 15, 17, 18, 26, 27, 28, 29]
+        valid = ((chars[:, 30] == 0)
+                 & (chars[:, 29] != 0)
+                 & (month_keys[found] == key)
+                 & np.all((digits[:, number_cols] >= 0) 
+                          & (digits[:, number_cols] <= 9), axis = 1)
+                 & np.all(chars[:, [3, 7, 10, 19, 25]] == ord(' '), axis = 1)
+                 & np.all(chars[:, [13, 16]] == ord(':'), axis = 1)
+                 & np.all(chars[:, 20:25] == np.frombuffer(b'+0000', 
+                                                          dtype = np.uint8),
+                          axis = 1)
+                 & (day >= 1) & (day <= month_days)
+                 & (hour <= 23) & (minute <= 59) & (second <= 59))
+    else:
+        valid = np.zeros(len(uniques), dtype = bool)
+    
+    if not len(uniques):
+        parsed = np.array([], dtype = 'datetime64[ns]')
+    elif valid.all():
+        # days since 1970-01-01 from a (proleptic Gregorian) calendar date
+        y = year - (month <= 2)
+        era = y // 400
+        yoe = y - era * 400
+        doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+        doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+        days = era * 146097 + doe - 719468
+        
+        seconds = days * 86400 + hour * 3600 + minute * 60 + second
+        parsed = seconds.astype('datetime64[s]').astype('datetime64[ns]')
+    else:
+        parsed = pd.to_datetime(uniques, 
+                                format = _TWITTER_DATE_FORMAT).to_numpy(
+                                                       dtype = 'datetime64[ns]')
+    
+    # put the parsed unique values back in place
+    dates = np.append(parsed, np.datetime64('NaT', 'ns'))[codes]
+    
+    if isinstance(values, pd.Series):
+        return pd.Series(dates, index = values.index, name = values.name)
+    return pd.DatetimeIndex(dates)
+
+
+def _id_array(values):
+    """
+    Converts a Series of ID strings (with None for missing) to a nullable
+    Int64 array without going through float, which would round off
+    Twitter's 18+ digit IDs.
+    """
+    import numpy as np
+    import pandas as pd
+
+    missing = values.isna().to_numpy()
+    ids = np.zeros(len(values), dtype = np.int64)
+    ids[~missing] = values[~missing].to_numpy(dtype = str).astype(np.int64)
+
+    return pd.arrays.IntegerArray(ids, missing)
+
+
+def _tweet_frame(rows, start = 0):
+    """
+    Builds the file_json_pandas() DataFrame from a list of _tweet_row()
+    tuples. The index starts at start so that chunks can be concatenated
+    without repeating index values.
+    
+    Columns are given compact types: int64 tweet/user IDs, nullable Int64
+    for counts and other IDs (missing when a tweet isn't a retweet or
+    reply), nullable booleans for flags, and categoricals for screen names
+    and media types.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame.from_records(rows,
+                                   columns = _TWEET_COLUMNS,
+                                   index = pd.RangeIndex(start,
+                                                         start + len(rows)))
 
     # create string columns of some lists (space as separator)
     df['tweet_hashtags_str'] = [' '.join(i) for i in df.tweet_hashtags]
@@ -317,24 +597,65 @@ def file_json_pandas(json_file):
     df['tweet_mentions_id_str'] = [' '.join(i) for i in df.tweet_mentions_id]
 
     # convert dates from string to pandas datetime
-    df['tweet_created_at'] = pd.to_datetime(df['tweet_created_at'], 
-                                         format = "%a %b %d %H:%M:%S +0000 %Y")
-    df['user_created'] = pd.to_datetime(df['user_created'], 
-                                         format = "%a %b %d %H:%M:%S +0000 %Y")   
-    
+    for col in _TWEET_DATE_COLUMNS:
+        df[col] = twitter_to_datetime(df[col])
+
+    # types
+    for col in _TWEET_ID_COLUMNS:
+        df[col] = df[col].astype('int64')
+    for col in _TWEET_NULLABLE_ID_COLUMNS:
+        df[col] = _id_array(df[col])
+    for col in _TWEET_COUNT_COLUMNS:
+        df[col] = df[col].astype('Int64')
+    for col in _TWEET_FLAG_COLUMNS:
+        df[col] = df[col].astype('boolean')
+    for col in _TWEET_CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+
     # remove new line ( "\n" ) from tweets.
     # Leaving these in will make all CSVs import incorrectly, jumping to
     # a new row every time \n is seen in text.
+    for col in _TWEET_TEXT_COLUMNS:
+        df[col] = df[col].str.replace('\n', '', regex = False)
+
+    return df
+
+
+def file_json_pandas(json_file):
+    """
+    Takes in a single JSON file and returns a pandas DataFrame. Option to
+    pickle or CSV.
+
+    The file is read incrementally and every field is pulled out of a tweet
+    in a single pass, so the raw tweets are never all held in memory at once.
+    If the resulting DataFrame itself is too big for memory, use
+    file_json_pandas_chunks() instead.
     
-    df.loc[:, 'tweet_text'] = df.loc[:, 'tweet_text'].apply(
-                                                 lambda x: re.sub('\n', '', x))
-    df.loc[:, 'rt_tweet_text'] = df.loc[:, 'rt_tweet_text'].apply(
-                                                 lambda x: re.sub('\n', '', x))
-    df.loc[:, 'rt_user_description'] = df.loc[:, 'rt_user_description'].apply(
-                                                 lambda x: re.sub('\n', '', x))    
-    df.loc[:, 'user_description'] = df.loc[:, 'user_description'].apply(
-                                                 lambda x: re.sub('\n', '', x))        
- 
+    IDs and counts are stored as integers (nullable Int64 where a value can
+    be missing, e.g., retweet fields on tweets that aren't retweets), flags
+    as booleans, and screen names and media types as categoricals.
+
+    json_file: (str)
+        Full location of JSON file. Either a JSON array of tweets or
+        JSON-lines (one tweet per line). No default.
+            e.g., json_file = "C:\\Users\\nwalker\\data\\filename.json"
+
+    pickle_out: (str)
+        Desired pickled filename. Defaults to None (no output).
+            e.g., pickleout="tweetdf.txt"
+
+    csv_out: (str)
+        Desired CSV filename. Defaults to None (no output).
+            e.g., csvout="tweetdf.csv"
+
+    Returns: pandas DataFrame
+    """
+
+    stage = _Stage('file_json_pandas', unit = 'tweets')
+    rows = [_tweet_row(tweet) for tweet in _iter_json_tweets(json_file)]
+    df = _tweet_frame(rows)
+    stage.done(len(df))
+
     """
     # It seems just like bloat to have pickling and csv-creation as built-in
     # options. Yes, it would be super handy to have them automatically
@@ -343,7 +664,181 @@ def file_json_pandas(json_file):
     # include pickling/CSV options in the example code. My fear is that I'll
     # have waaaay too many variables down the line and it will magically
     # go from useful to useless.
+
+    if pickle_out != None:
+        with open(pickle_out, "wb") as file:
+            try:
+                pickle.dump(df, file)
+                print("Created pickle with filename "
+                      + pickle_out)
+            except:
+                print("Couldn't pickle. Was your filename complete?")
+                pass
+
+    if csv_out != None:
+        try:
+            df.to_csv(csv_out)
+            print("Created CSV with filename "
+                  + csv_out)
+        except:
+            print("Couldn't create CSV. Was your filename complete?")
+            pass
+    """
+    return df
+
+
+def file_json_pandas_chunks(json_file,
+                            chunksize = 10000):
+    """
+    Streaming version of file_json_pandas(). Reads a single JSON file one
+    tweet at a time and yields pandas DataFrames of (at most) chunksize
+    tweets each, so peak memory depends on chunksize rather than on the size
+    of the file.
+
+    json_file: (str)
+        Full location of JSON file. Either a JSON array of tweets or
+        JSON-lines (one tweet per line). No default.
+            e.g., json_file = "C:\\Users\\nwalker\\data\\filename.json"
+
+    chunksize: (int)
+        Number of tweets in each DataFrame. Defaults to 10000.
+
+    Returns generator of pandas DataFrames. The index runs on from one chunk
+    to the next, so pd.concat() of all chunks has the same rows as
+    file_json_pandas() (categorical columns only stay categorical if every
+    chunk happens to have the same categories).
+        e.g., for chunk in file_json_pandas_chunks("big.json"):
+                  chunk.to_csv("big.csv", mode = "a")
+    """
+
+    start = 0
+    rows = []
+    for tweet in _iter_json_tweets(json_file):
+        rows.append(_tweet_row(tweet))
+        if len(rows) == chunksize:
+            yield _tweet_frame(rows, start = start)
+            start += len(rows)
+            rows = []
+
+    if rows:
+        yield _tweet_frame(rows, start = start)
+
+
+def _file_json_rows(json_file):
+    """
+    Worker for _load_json_files(). Reads a single JSON file into a list of
+    _tweet_row() tuples.
+
+    returns tuple: (rows, file size in bytes, seconds spent parsing)
+    """
+    import os
+    import time
+
+    start = time.time()
+    rows = [_tweet_row(tweet) for tweet in _iter_json_tweets(json_file)]
+
+    return rows, os.path.getsize(json_file), time.time() - start
+
+
+def _load_json_files(json_files, processes = None):
+    """
+    Parses each of json_files across a pool of processes and yields
+    (json_file, rows) in the same order as json_files, whichever order the
+    workers finish in. Logs the throughput of every file.
+
+    json_files: (list of str)
+        Full locations of JSON files.
+
+    processes: (int)
+        Number of worker processes. Defaults to None (one per CPU core).
+        With 1, files are parsed in this process.
+
+    returns generator of tuples
+    """
+    import logging
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    logger = logging.getLogger()
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(json_files)))
+
+    if processes == 1:
+        results = map(_file_json_rows, json_files)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers = processes)
+        results = executor.map(_file_json_rows, json_files)
+
+    try:
+        for json_file, (rows, size, seconds) in zip(json_files, results):
+            seconds = max(seconds, 1e-9)
+            logger.info("Loaded " + json_file + ": "
+                        + repr(len(rows)) + " tweets in "
+                        + "%.2f" % seconds + " seconds ("
+                        + "%.0f" % (len(rows) / seconds) + " tweets/sec, "
+                        + "%.1f" % (size / 1e6 / seconds) + " MB/sec)")
+            yield json_file, rows
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures = True)
+
+
+def folder_json_pandas(in_folder,
+                       processes = None):
+    """
+    Imports all JSON files in in_folder and returns a single pandas DataFrame.
+    Option to pickle or CSV.
+    
+    Files are parsed concurrently in a pool of processes, but rows always come
+    out in the same (sorted by filename) order. Per-file throughput is logged,
+    so set logger for progress reporting. On Windows, call this from under an
+    if __name__ == "__main__": guard.
+    
+    in_folder: (str)
+        Full location of folder with all JSON files. No default.
+            e.g., "C:\\Users\\nwalker\\data\\json_folder"
+            
+    processes: (int)
+        Number of files to parse at once. Defaults to None (one per CPU core).
+        Set to 1 to parse everything in the current process.
+            
+    pickle_out: (str)
+        Name of pickled data. Default is None (no output).
+            e.g., "tweet_pickles.txt"
+    
+    csv_out: (str)
+        Name of CSV file for output. Default is None (no output).
+            e.g., "all_my_tweets.csv"
+    
+    Returns pandas DataFrame
+    """
+    
+    import os
+        
+    # import data
+    folder = sorted(os.listdir(in_folder))
+    folder = [os.path.join(in_folder, i) 
+              for i in folder 
+              if i[-4:] == 'json'] # remove non-JSON files
+    
+    stage = _Stage('folder_json_pandas', unit = 'tweets', files = len(folder))
+    
+    # collect rows from every file into one list, dropping each file's rows
+    # as soon as they're copied over so only one copy is ever held
+    all_rows = []
+    for json_file, rows in _load_json_files(folder, processes = processes):
+        all_rows.extend(rows)
+        del rows
+    
+    df = _tweet_frame(all_rows)
+    del all_rows
+    stage.done(len(df))
     
+    """
+    # See note above on removing this data.
     if pickle_out != None:
         with open(pickle_out, "wb") as file:
             try:
@@ -351,7 +846,7 @@ def file_json_pandas(json_file):
                 print("Created pickle with filename " 
                       + pickle_out)
             except:
-                print("Couldn't pickle. Was your filename complete?")
+                print("Couldn't pickle.")
                 pass
             
     if csv_out != None:
@@ -360,108 +855,1448 @@ def file_json_pandas(json_file):
             print("Created CSV with filename " 
                   + csv_out)
         except:
-            print("Couldn't create CSV. Was your filename complete?")
+            print("Couldn't create CSV.")
             pass            
     """
-    return df
+    
+    return df
+
+
+'''
+Tweet store
+'''
+
+_STORE_PARTITION = 'tweet_date'
+
+
+def _store_partitioning():
+    """
+    Hive-style partitioning of the tweet store, one directory per day:
+        store_path/tweet_date=2017-10-31/...
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([(_STORE_PARTITION, pa.string())]),
+                           flavor = 'hive')
+
+
+def _store_schema(schema):
+    """
+    schema (pyarrow) with every column of _tweet_frame() set to one fixed 
+    type, so that all writes to the tweet store agree with each other even 
+    when a batch has, e.g., no replies (a column of nothing but missing 
+    values, which pyarrow would otherwise write as type null). Other 
+    columns keep the type they have in schema.
+    """
+    import pyarrow as pa
+    
+    types = {col : pa.large_string() 
+             for col in _TWEET_COLUMNS + ('tweet_hashtags_str',
+                                          'tweet_mentions_id_str')}
+    types.update({col : pa.list_(pa.string()) 
+                  for col in _TWEET_LIST_COLUMNS})
+    types.update({col : pa.timestamp('ns') for col in _TWEET_DATE_COLUMNS})
+    types.update({col : pa.int64() 
+                  for col in (_TWEET_ID_COLUMNS 
+                              + _TWEET_NULLABLE_ID_COLUMNS 
+                              + _TWEET_COUNT_COLUMNS)})
+    types.update({col : pa.bool_() for col in _TWEET_FLAG_COLUMNS})
+    types.update({col : pa.dictionary(pa.int32(), pa.large_string()) 
+                  for col in _TWEET_CATEGORY_COLUMNS})
+    types[_STORE_PARTITION] = pa.string()
+    
+    return pa.schema([pa.field(field.name, types.get(field.name, field.type))
+                      for field in schema],
+                     metadata = schema.metadata)
+
+
+def pandas_parquet(data,
+                   store_path,
+                   tweet_created_at = 'tweet_created_at',
+                   basename_template = None):
+    """
+    Writes a DataFrame from file_json_pandas() or folder_json_pandas() to a
+    Parquet dataset partitioned by the date of tweet_created_at. List columns
+    (tweet_hashtags, tweet_urls, etc.) are stored as Parquet lists. Writing
+    to an existing store adds to it. Read it back with parquet_pandas().
+    *   Requires pyarrow: https://arrow.apache.org
+    
+    data: (pandas DataFrame)
+        DataFrame of tweets.
+        
+    store_path: (str)
+        Folder the dataset is written to. Created if it doesn't exist.
+            e.g., "C:\\Users\\nwalker\\data\\tweet_store"
+            
+    tweet_created_at: (str)
+        Column name in data for the date the tweet was posted. Defaults
+        to "tweet_created_at"
+        
+    basename_template: (str)
+        Name of the written files, where "{i}" is replaced by a counter.
+        Defaults to None (a unique name per call).
+        
+    returns nothing
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    data = data.copy(deep = False)
+    data[_STORE_PARTITION] = data[tweet_created_at].dt.strftime('%Y-%m-%d')
+    
+    schema = _store_schema(pa.Schema.from_pandas(data, 
+                                                 preserve_index = False))
+    table = pa.Table.from_pandas(data, 
+                                 schema = schema, 
+                                 preserve_index = False)
+    del data
+    
+    pq.write_to_dataset(table,
+                        store_path,
+                        partition_cols = [_STORE_PARTITION],
+                        basename_template = basename_template,
+                        existing_data_behavior = 'overwrite_or_ignore')
+
+
+def parquet_pandas(store_path,
+                   columns = None,
+                   dates = None):
+    """
+    Reads tweets written by pandas_parquet() back into a pandas DataFrame.
+    Only the requested columns and days are read off disk (memory-mapped),
+    so this is much faster than re-importing the JSON.
+    *   Requires pyarrow: https://arrow.apache.org
+    
+    store_path: (str)
+        Folder the dataset was written to.
+        
+    columns: (list of str)
+        Columns to read. Defaults to None (all columns).
+            e.g., ['tweet_id', 'tweet_text', 'tweet_created_at']
+            
+    dates: (list of str or datetime)
+        Days to read. Defaults to None (all days).
+            e.g., ['2017-10-30', '2017-10-31']
+            
+    Returns pandas DataFrame
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    
+    filters = None
+    if dates is not None:
+        dates = [pd.Timestamp(date).strftime('%Y-%m-%d') for date in dates]
+        filters = [(_STORE_PARTITION, 'in', dates)]
+    
+    # the first file's schema, but with the fixed types of pandas_parquet()
+    schema = _store_schema(ds.dataset(store_path, 
+                                      format = 'parquet',
+                                      partitioning = _store_partitioning()
+                                      ).schema)
+    
+    table = pq.read_table(store_path,
+                          columns = columns,
+                          filters = filters,
+                          memory_map = True,
+                          partitioning = _store_partitioning(),
+                          schema = schema)
+    if columns is None:
+        table = table.drop([_STORE_PARTITION])
+    names = table.column_names
+    
+    # pyarrow hands back list columns as numpy arrays -- keep them as lists,
+    # the same as file_json_pandas()
+    list_cols = {field.name : table.column(field.name).to_pylist()
+                 for field in table.schema 
+                 if pa.types.is_list(field.type)}
+    table = table.drop(list(list_cols))
+    
+    df = table.to_pandas(split_blocks = True, self_destruct = True)
+    del table
+    for col, values in list_cols.items():
+        df[col] = values
+    
+    return df[names]
+
+
+def _file_digest(filepath, block_size = 1 << 20):
+    """
+    SHA-1 hex digest of a file's contents, read block_size bytes at a time.
+    """
+    import hashlib
+
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def folder_json_parquet(in_folder,
+                        store_path,
+                        processes = None,
+                        manifest_filepath = None):
+    """
+    Incremental version of folder_json_pandas() + pandas_parquet(). Keeps a
+    manifest of every JSON file already ingested (keyed by path, with its
+    size, modification time, and a hash of its contents) and only imports
+    files that are new or have changed since the last run, adding them to
+    the tweet store. A changed file replaces the tweets it added before.
+    Files that disappear from in_folder are left in the store.
+    *   Requires pyarrow: https://arrow.apache.org
+    
+    in_folder: (str)
+        Full location of folder with all JSON files. No default.
+            e.g., "C:\\Users\\nwalker\\data\\json_folder"
+            
+    store_path: (str)
+        Folder of the tweet store (see pandas_parquet()). No default.
+        
+    processes: (int)
+        Number of files to parse at once. Defaults to None (one per CPU core).
+        
+    manifest_filepath: (str)
+        Where the manifest is kept. Defaults to None ("_manifest.json" inside
+        store_path, which parquet_pandas() ignores).
+        
+    Returns list of the JSON files that were imported this time.
+    """
+    import hashlib
+    import json
+    import logging
+    import os
+    
+    logger = logging.getLogger()
+    
+    if manifest_filepath is None:
+        manifest_filepath = os.path.join(store_path, '_manifest.json')
+    
+    manifest = dict()
+    if os.path.exists(manifest_filepath):
+        with open(manifest_filepath, 'r', encoding = 'utf-8') as file:
+            manifest = json.load(file)
+    
+    def save_manifest():
+        # write-then-rename, so a crash never leaves half a manifest behind
+        os.makedirs(os.path.dirname(os.path.abspath(manifest_filepath)),
+                    exist_ok = True)
+        with open(manifest_filepath + '.tmp', 'w', encoding = 'utf-8') as file:
+            json.dump(manifest, file, indent = 1, sort_keys = True)
+        os.replace(manifest_filepath + '.tmp', manifest_filepath)
+    
+    folder = sorted(os.listdir(in_folder))
+    folder = [os.path.abspath(os.path.join(in_folder, i)) 
+              for i in folder 
+              if i[-4:] == 'json'] # remove non-JSON files
+    
+    # find new/changed files. The content hash is only needed when size or
+    # mtime don't match what the manifest has.
+    to_ingest = list()
+    file_info = dict()
+    for json_file in folder:
+        stat = os.stat(json_file)
+        info = {'size' : stat.st_size, 'mtime' : stat.st_mtime}
+        seen = manifest.get(json_file)
+        if (seen is not None 
+            and seen['size'] == info['size'] 
+            and seen['mtime'] == info['mtime']):
+            continue
+        
+        info['sha1'] = _file_digest(json_file)
+        if seen is not None and seen['sha1'] == info['sha1']:
+            seen.update(info) # touched, but same contents
+            continue
+        
+        # each file's tweets are written under their own name so they can
+        # be found (and replaced) again if the file changes
+        info['key'] = hashlib.sha1(json_file.encode('utf-8')).hexdigest()[:16]
+        file_info[json_file] = info
+        to_ingest.append(json_file)
+    
+    save_manifest()
+    logger.info(repr(len(to_ingest)) + " of " + repr(len(folder)) 
+                + " files are new or changed.")
+    
+    stage = _Stage('folder_json_parquet', 
+                   unit = 'tweets', 
+                   files = len(to_ingest))
+    for json_file, rows in _load_json_files(to_ingest, processes = processes):
+        info = file_info[json_file]
+        stage.add(len(rows))
+        
+        if json_file in manifest:
+            # changed file: drop the tweets it added last time
+            for partition in os.listdir(store_path):
+                partition = os.path.join(store_path, partition)
+                if not os.path.isdir(partition):
+                    continue
+                for fragment in os.listdir(partition):
+                    if fragment.startswith(info['key'] + '-'):
+                        os.remove(os.path.join(partition, fragment))
+        
+        pandas_parquet(_tweet_frame(rows), 
+                       store_path,
+                       basename_template = info['key'] + '-{i}.parquet')
+        del rows
+        
+        manifest[json_file] = info
+        save_manifest()
+    
+    stage.done()
+    
+    return to_ingest
+
+
+def spacy_parse(data,
+                tweet_text = "tweet_text",
+                tweet_id = "tweet_id",
+                model = "en",
+                batch_size = 1000,
+                n_process = 1,
+                disable = ("parser", "ner"),
+                compact = False,
+                cache_path = None):
+    """
+    Parses each tweet using spaCy v.2.0. Requires English model linked as 'en'
+    which can be installed by typing "python -m spacy download en" at the
+    command prompt (will probably require you to right-click and "run as 
+    Administrator" to be able to link).
+    
+    Tweets are fed to nlp.pipe() straight from the DataFrame. Parsing speed
+    (tweets/sec) is logged and recorded (see stage_report()), so set logger
+    for progress reporting.
+    
+    data (pandas DataFrame)
+        DataFrame containing at least a column of tweet text.
+    
+    tweet_text (str)
+        Column name in data for the text of tweets. Defaults to "tweet_text"
+    
+    tweet_id (str)
+        Column name in data for the ID number of tweets. Defaults to 
+        "tweet_id"
+        
+    model (str)
+        Name of the spaCy model to load. Defaults to "en".
+        
+    batch_size (int)
+        Number of tweets spaCy works on at a time. Defaults to 1000.
+        
+    n_process (int)
+        Number of processes to parse with. Defaults to 1. Anything above 1
+        needs spaCy 2.2.2+.
+        
+    disable (list of str)
+        Pipeline components to skip. None of the later steps in effort use
+        the dependency parse or named entities (only lemmas, vectors, and
+        lexical flags like .is_punct), so by default these are turned off,
+        which makes parsing several times faster. Pass () to run the full
+        pipeline. Defaults to ("parser", "ner").
+        
+    compact (bool)
+        Store a CompactDoc (lemmas, lexical flags, and summed vector held in
+        one shared CompactParse) for each tweet instead of a spaCy Doc. Every
+        function in effort takes either. Use this on large datasets: the Docs
+        take tens of GB for millions of tweets. Defaults to False.
+        
+    cache_path (str)
+        Folder for a parse cache that is kept between runs (implies compact).
+        Tweets are looked up by a hash of their (whitespace-normalized) text
+        along with the model's name and version, so only tweets that have
+        never been parsed before with this model are parsed, and identical
+        tweets (retweets, spam) are parsed once. Cached parses are 
+        memory-mapped back in. Defaults to None (no cache).
+            e.g., cache_path = "C:\\Users\\nwalker\\data\\parse_cache"
+    
+    Returns nothing, but 'parsed' column is added inplace to data DataFrame.
+    This new dataset can be pickled
+    """
+    
+    import spacy.lang.en
+    
+    # load parser
+    nlp = spacy.load(model, disable = list(disable))
+    
+    pipe_args = {'batch_size' : batch_size}
+    if n_process != 1:
+        pipe_args['n_process'] = n_process
+    
+    tweets = data.loc[:, tweet_text].fillna('').tolist()
+    
+    stage = _Stage('spacy_parse', unit = 'tweets')
+    if cache_path is not None:
+        tweet_list = _cached_compact_parse(nlp, tweets, cache_path, pipe_args)
+    elif compact:
+        tweet_list = CompactParse.from_docs(nlp.pipe(tweets, **pipe_args)).docs()
+    else:
+        tweet_list = list(nlp.pipe(tweets, **pipe_args))
+    stage.done(len(tweet_list))
+    
+    data['parsed'] = tweet_list
+
+
+'''
+Compact parses
+'''
+
+# bits of CompactParse.flags
+_PARSE_REMOVE = 1 # thing_to_remove(token)
+_PARSE_HANDLE = 2 # Twitter handle (@so-and-so)
+
+
+class CompactParse(object):
+    """
+    Array-backed stand-in for a column of spaCy Docs. Everything after
+    parsing only ever uses a few things from each token (its lemma, whether
+    thing_to_remove() is true, and its vector, summed per tweet), so that is
+    all that is kept -- a small fraction of the memory of the Docs, and it
+    pickles quickly. Made by spacy_parse(compact = True).
+    
+    lemma_ids: (uint64 array)
+        spaCy's lemma hash of every token, tweet after tweet.
+        
+    flags: (uint8 array)
+        Bitmask for every token: 1 = thing_to_remove(), 2 = Twitter handle.
+        
+    offsets: (int64 array)
+        Tweet i's tokens are lemma_ids[offsets[i]:offsets[i + 1]].
+        
+    vectors: (float32 array, one row per tweet)
+        Sum of the vectors of each tweet's tokens, leaving out 
+        thing_to_remove() tokens and Twitter handles (see remove_duplicates()).
+        
+    vector_counts: (int32 array)
+        Number of tokens summed into each row of vectors.
+        
+    strings: (dict)
+        Lemma text of every lemma hash.
+    """
+    
+    def __init__(self, lemma_ids, flags, offsets, vectors, vector_counts,
+                 strings):
+        self.lemma_ids = lemma_ids
+        self.flags = flags
+        self.offsets = offsets
+        self.vectors = vectors
+        self.vector_counts = vector_counts
+        self.strings = strings
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    @classmethod
+    def from_docs(cls, docs):
+        """
+        Builds a CompactParse from an iterable of spaCy Docs (e.g., straight
+        out of nlp.pipe()), one Doc at a time, so the Docs never have to be
+        held in memory together.
+        """
+        from array import array
+        import numpy as np
+        
+        lemma_ids = array('Q')
+        flags = array('B')
+        offsets = array('q', [0])
+        vector_counts = array('i')
+        vectors = list()
+        strings = dict()
+        
+        for doc in docs:
+            keepers = list()
+            for token in doc:
+                lemma = token.lemma_
+                flag = 0
+                if thing_to_remove(token):
+                    flag |= _PARSE_REMOVE
+                if lemma[:1] == '@':
+                    flag |= _PARSE_HANDLE
+                if not flag:
+                    keepers.append(token.vector)
+                if token.lemma not in strings:
+                    strings[token.lemma] = lemma
+                lemma_ids.append(token.lemma)
+                flags.append(flag)
+            offsets.append(len(lemma_ids))
+            vectors.append(sum(keepers))
+            vector_counts.append(len(keepers))
+        
+        # tweets with nothing to sum come out as 0, not as a vector
+        dim = max([np.shape(vector)[0] 
+                   for vector in vectors 
+                   if np.ndim(vector)] or [0])
+        vector_array = np.zeros((len(vectors), dim), dtype = np.float32)
+        for i, vector in enumerate(vectors):
+            if np.ndim(vector):
+                vector_array[i] = vector
+        del vectors
+        
+        return cls(np.frombuffer(lemma_ids, dtype = np.uint64),
+                   np.frombuffer(flags, dtype = np.uint8),
+                   np.frombuffer(offsets, dtype = np.int64),
+                   vector_array,
+                   np.frombuffer(vector_counts, dtype = np.int32),
+                   strings)
+    
+    def lemmas(self, i):
+        """
+        Lemmas of tweet i, leaving out thing_to_remove() tokens -- the same
+        as [token.lemma_ for token in doc if not thing_to_remove(token)].
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        keep = (self.flags[start:end] & _PARSE_REMOVE) == 0
+        return [self.strings[lemma] 
+                for lemma in self.lemma_ids[start:end][keep].tolist()]
+    
+    def docs(self, rows = None):
+        """
+        List of CompactDoc, one per tweet, to put in a DataFrame column.
+        rows picks which tweet each CompactDoc points to (the same tweet can
+        be used more than once). Defaults to None (every tweet, in order).
+        """
+        if rows is None:
+            rows = range(len(self))
+        return [CompactDoc(self, i) for i in rows]
+    
+    def take(self, rows):
+        """
+        New CompactParse of just the tweets in rows (array of positions).
+        """
+        import numpy as np
+        
+        rows = np.asarray(rows, dtype = np.int64)
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        offsets = np.zeros(len(rows) + 1, dtype = np.int64)
+        np.cumsum(lengths, out = offsets[1:])
+        
+        # position of every token to keep, tweet after tweet
+        tokens = (np.repeat(starts - offsets[:-1], lengths) 
+                  + np.arange(offsets[-1], dtype = np.int64))
+        
+        return CompactParse(self.lemma_ids[tokens],
+                            self.flags[tokens],
+                            offsets,
+                            self.vectors[rows],
+                            self.vector_counts[rows],
+                            self.strings)
+    
+    @classmethod
+    def concat(cls, parses):
+        """
+        Joins a list of CompactParse into one, in order.
+        """
+        import numpy as np
+        
+        offsets = [np.zeros(1, dtype = np.int64)]
+        shift = 0
+        strings = dict()
+        for parse in parses:
+            offsets.append(np.asarray(parse.offsets[1:]) + shift)
+            shift += int(parse.offsets[-1])
+            strings.update(parse.strings)
+        dim = max([parse.vectors.shape[1] for parse in parses] or [0])
+        
+        return cls(np.concatenate([np.zeros(0, dtype = np.uint64)] 
+                                  + [parse.lemma_ids for parse in parses]),
+                   np.concatenate([np.zeros(0, dtype = np.uint8)] 
+                                  + [parse.flags for parse in parses]),
+                   np.concatenate(offsets),
+                   np.concatenate([np.zeros((0, dim), dtype = np.float32)] 
+                                  + [parse.vectors 
+                                     if parse.vectors.shape[1] == dim
+                                     else np.zeros((len(parse), dim), 
+                                                   dtype = np.float32)
+                                     for parse in parses]),
+                   np.concatenate([np.zeros(0, dtype = np.int32)] 
+                                  + [parse.vector_counts for parse in parses]),
+                   strings)
+    
+    _ARRAYS = ('lemma_ids', 'flags', 'offsets', 'vectors', 'vector_counts')
+    
+    def save(self, path):
+        """
+        Saves to folder path: one .npy file per array (so they can be
+        memory-mapped by load()) plus strings.json.
+        """
+        import json
+        import os
+        import numpy as np
+        
+        os.makedirs(path, exist_ok = True)
+        for name in self._ARRAYS:
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+        with open(os.path.join(path, 'strings.json'), 'w', 
+                  encoding = 'utf-8') as file:
+            json.dump({str(k) : v for k, v in self.strings.items()}, file)
+    
+    @classmethod
+    def load(cls, path, mmap = True):
+        """
+        Loads a CompactParse written by save(). With mmap (default True), the
+        arrays are memory-mapped rather than read into memory.
+        """
+        import json
+        import os
+        import numpy as np
+        
+        arrays = [np.load(os.path.join(path, name + '.npy'),
+                          mmap_mode = 'r' if mmap else None)
+                  for name in cls._ARRAYS]
+        with open(os.path.join(path, 'strings.json'), 'r', 
+                  encoding = 'utf-8') as file:
+            strings = {int(k) : v for k, v in json.load(file).items()}
+        
+        return cls(*arrays, strings)
+
+
+class CompactDoc(object):
+    """
+    A single tweet of a CompactParse. This is what data['parsed'] holds
+    after spacy_parse(compact = True), and it can be used anywhere in effort
+    that takes a spaCy Doc.
+    """
+    __slots__ = ('parse', 'i')
+    
+    def __init__(self, parse, i):
+        self.parse = parse
+        self.i = i
+    
+    def __len__(self):
+        return int(self.parse.offsets[self.i + 1] - self.parse.offsets[self.i])
+    
+    @property
+    def lemmas(self):
+        return self.parse.lemmas(self.i)
+    
+    @property
+    def vector(self):
+        return self.parse.vectors[self.i]
+    
+    @property
+    def vector_count(self):
+        return int(self.parse.vector_counts[self.i])
+
+
+def _parse_cache_key(text):
+    """
+    Normalizes a tweet for the parse cache (Unicode NFC, runs of whitespace
+    squeezed to one space, no leading/trailing whitespace). Returns the
+    normalized text and a 16-byte hash of it (as 32 hex digits).
+    """
+    import hashlib
+    import unicodedata
+    
+    text = u' '.join(unicodedata.normalize('NFC', text).split())
+    
+    return text, hashlib.blake2b(text.encode('utf-8'), 
+                                 digest_size = 16).hexdigest().encode('ascii')
+
+
+def _cached_compact_parse(nlp, tweets, cache_path, pipe_args):
+    """
+    Parses tweets (list of str) into CompactDocs, going through the on-disk
+    parse cache in cache_path. See spacy_parse().
+    
+    The cache has a folder for every model (name, version, and pipeline),
+    and in that a folder for every run that added to it ("segments"), each a
+    CompactParse saved with its tweets sorted by hash plus keys.npy of those
+    hashes. Only tweets that aren't in any segment are parsed -- and only
+    once each, no matter how many times they're repeated -- and these are
+    written as a new segment.
+    """
+    import hashlib
+    import logging
+    import os
+    import uuid
+    import numpy as np
+    
+    logger = logging.getLogger()
+    
+    model_name = (nlp.meta.get('lang', '') + '_' + nlp.meta.get('name', '')
+                  + '-' + nlp.meta.get('version', '') + '|' 
+                  + ','.join(nlp.pipe_names))
+    model_path = os.path.join(cache_path, 
+                              hashlib.sha1(model_name.encode('utf-8'))
+                                  .hexdigest()[:16])
+    os.makedirs(model_path, exist_ok = True)
+    
+    # hash every tweet; repeated texts are looked up (and parsed) only once
+    texts = dict()
+    keys = list()
+    for tweet in tweets:
+        text, key = _parse_cache_key(tweet)
+        texts.setdefault(key, text)
+        keys.append(key)
+    keys, inverse = np.unique(np.array(keys, dtype = 'S32'), 
+                              return_inverse = True)
+    
+    # look up each hash in each segment
+    segments = sorted(i for i in os.listdir(model_path) 
+                      if not i.startswith('.'))
+    found_in = np.full(len(keys), -1, dtype = np.int64)
+    found_row = np.zeros(len(keys), dtype = np.int64)
+    for n, segment in enumerate(segments):
+        seg_keys = np.load(os.path.join(model_path, segment, 'keys.npy'),
+                           mmap_mode = 'r')
+        if not len(seg_keys):
+            continue
+        pos = np.minimum(np.searchsorted(seg_keys, keys), len(seg_keys) - 1)
+        hit = (found_in < 0) & (seg_keys[pos] == keys)
+        found_in[hit] = n
+        found_row[hit] = pos[hit]
+    
+    missing = np.flatnonzero(found_in < 0)
+    logger.info("Parse cache: " + repr(len(keys) - len(missing)) + " of " 
+                + repr(len(keys)) + " distinct tweets found ("
+                + repr(len(tweets)) + " tweets in all).")
+    
+    # parse what's missing and save it as a new segment (keys are already
+    # sorted, so the segment is too)
+    if len(missing):
+        new_parse = CompactParse.from_docs(
+                        nlp.pipe([texts[keys[i]] for i in missing], 
+                                 **pipe_args))
+        segment = 'seg-' + uuid.uuid4().hex
+        tmp_path = os.path.join(model_path, '.' + segment)
+        new_parse.save(tmp_path)
+        np.save(os.path.join(tmp_path, 'keys.npy'), keys[missing])
+        os.replace(tmp_path, os.path.join(model_path, segment))
+        
+        segments.append(segment)
+        found_in[missing] = len(segments) - 1
+        found_row[missing] = np.arange(len(missing))
+    
+    # pull the needed rows out of each (memory-mapped) segment
+    parts = list()
+    position = np.zeros(len(keys), dtype = np.int64)
+    count = 0
+    for n, segment in enumerate(segments):
+        wanted = np.flatnonzero(found_in == n)
+        if not len(wanted):
+            continue
+        parse = CompactParse.load(os.path.join(model_path, segment))
+        parts.append(parse.take(found_row[wanted]))
+        position[wanted] = np.arange(count, count + len(wanted))
+        count += len(wanted)
+    
+    return CompactParse.concat(parts).docs(position[inverse])
+
+
+def _doc_lemmas(doc):
+    """
+    Lemmas of a spaCy Doc or CompactDoc, leaving out thing_to_remove() tokens.
+    """
+    if isinstance(doc, CompactDoc):
+        return doc.lemmas
+    return [token.lemma_ 
+            for token in doc
+            if not thing_to_remove(token)]
+
+
+def _doc_vector(doc):
+    """
+    Summed vector of a spaCy Doc or CompactDoc, leaving out thing_to_remove()
+    tokens and Twitter handles, and the number of tokens summed. A tweet with
+    nothing to sum gives 0.
+    """
+    if isinstance(doc, CompactDoc):
+        return doc.vector, doc.vector_count
+    keepers = [token.vector 
+               for token in doc
+               if not (thing_to_remove(token)
+                       or token.lemma_[0] == '@')] # remove Twitter handles
+    return sum(keepers), len(keepers)
+
+
+# what thing_to_remove() and the Twitter-handle check in remove_duplicates()
+# take out of a tweet, as a regular expression: URLs, handles, "RT", numbers,
+# and punctuation
+_DUPLICATE_TEXT_PATTERN = (r'https?://\S+|www\.\S+|@\w+|\bRT\b'
+                           r'|\d+(?:[.,]\d+)*|[^\w\s]|_')
+
+
+def _exact_duplicate_groups(data,
+                            tweet_text = "tweet_text",
+                            tweet_created_at = "tweet_created_at",
+                            rt_tweet_id = "rt_tweet_id"):
+    """
+    Cheap first pass of remove_duplicates(): groups tweets that are certainly
+    duplicates without comparing any vectors. Retweets of the same tweet
+    (same rt_tweet_id) form one group; all other tweets are grouped by a hash
+    of their text once URLs, handles, "RT", numbers, punctuation, and extra
+    whitespace are taken out (as thing_to_remove() does; case is kept, as 
+    the tweet vectors keep it). Tweets with nothing left after that are left
+    on their own.
+    
+    returns numpy array of positions (in data) of each row's representative:
+    the earliest tweet (by tweet_created_at) in its group
+    """
+    import numpy as np
+    import pandas as pd
+    
+    n = len(data)
+    positions = np.arange(n)
+    
+    normalized = (data[tweet_text].fillna('').astype(str)
+                  .str.replace(_DUPLICATE_TEXT_PATTERN, ' ', regex = True)
+                  .str.split()
+                  .str.join(' '))
+    
+    # kind of key: 0 = retweet, 1 = text, 2 = nothing to go on (own group)
+    kind = np.where(normalized.ne('').to_numpy(), 1, 2)
+    key = pd.util.hash_pandas_object(normalized, 
+                                     index = False).to_numpy(dtype = np.uint64)
+    key = np.where(kind == 2, positions.astype(np.uint64), key)
+    
+    if rt_tweet_id in data.columns:
+        rt = data[rt_tweet_id]
+        is_rt = (rt.notna() & rt.astype(str).ne('')).to_numpy()
+        rt_codes = pd.factorize(rt[is_rt].astype(str))[0]
+        kind[is_rt] = 0
+        key[is_rt] = rt_codes.astype(np.uint64)
+    
+    groups = pd.DataFrame({'kind' : kind,
+                           'key' : key,
+                           'created' : data[tweet_created_at].to_numpy(),
+                           'position' : positions})
+    
+    # earliest first (ties go to the first row), then take the first of 
+    # each group
+    groups = groups.sort_values(['kind', 'key', 'created', 'position'],
+                                kind = 'mergesort')
+    first = ~groups.duplicated(['kind', 'key']).to_numpy()
+    rep = groups['position'].to_numpy()[first]
+    
+    reps = np.empty(n, dtype = np.int64)
+    reps[groups['position'].to_numpy()] = np.repeat(rep, 
+                                                    np.diff(np.append(
+                                                        np.flatnonzero(first),
+                                                        n)))
+    
+    return reps
+
+
+def _tweet_vectors(docs):
+    """
+    Unit-length float32 vector (_doc_vector() divided by its norm) of each 
+    of docs (spaCy Docs or CompactDocs), for remove_duplicates().
+    
+    returns tuple:
+        vectors: one row per tweet that doesn't have a norm of 0
+        nonzero: (bool array) which of docs have a row
+    """
+    import numpy as np
+    
+    vector_list = list()
+    nonzero = np.zeros(len(docs), dtype = bool)
+    
+    for i, doc in enumerate(docs):
+        summed, _ = _doc_vector(doc)
+        norm = np.sqrt(np.dot(summed, summed))
+        if norm != 0:
+            nonzero[i] = True
+            vector_list.append(np.asarray(summed, dtype = np.float32) / norm)
+    
+    if vector_list:
+        vectors = np.vstack(vector_list).astype(np.float32, copy = False)
+    else:
+        vectors = np.zeros((0, 0), dtype = np.float32)
+    
+    return vectors, nonzero
+
+
+def _similar_pairs(vectors,
+                   sim_amt,
+                   rows = None,
+                   cols = None,
+                   block_size = 2048):
+    """
+    Finds every pair of tweets with a cosine similarity over sim_amt. The
+    rows of vectors must already be unit length (divided by .vector_norm),
+    so a block of similarities is one matrix multiplication. Tweets are
+    compared block_size x block_size at a time, which keeps memory use
+    bounded (block_size ** 2 floats) no matter how many tweets there are.
+    
+    vectors: (float32 numpy array)
+        One unit-length row per tweet.
+        
+    sim_amt: (float)
+        Cosine similarity threshold.
+        
+    rows: (numpy array of int)
+        Rows of vectors to compare. Defaults to None (all of them).
+        
+    cols: (numpy array of int)
+        If given, rows are compared against cols instead of against each 
+        other. Defaults to None.
+        
+    block_size: (int)
+        Number of tweets per block. Defaults to 2048.
+    
+    returns generator of (left, right) numpy arrays of rows of vectors. 
+        Without cols, each pair only comes up once (left comes before right
+        in rows).
+    """
+    import numpy as np
+    
+    if rows is None:
+        rows = np.arange(len(vectors))
+    rows = np.asarray(rows, dtype = np.int64)
+    same = cols is None
+    cols = rows if same else np.asarray(cols, dtype = np.int64)
+    
+    for r_start in range(0, len(rows), block_size):
+        left = rows[r_start:r_start + block_size]
+        left_vectors = vectors[left]
+        
+        for c_start in range(r_start if same else 0, len(cols), block_size):
+            right = cols[c_start:c_start + block_size]
+            sims = left_vectors @ vectors[right].T
+            i, j = np.nonzero(sims > sim_amt)
+            if same and c_start == r_start:
+                # diagonal block: only pairs above the diagonal
+                keep = j > i
+                i, j = i[keep], j[keep]
+            if len(i):
+                yield left[i], right[j]
+
+
+# vectors of the remove_duplicates() worker processes, in shared memory
+_shared_vectors = None
+
+
+def _attach_shared_vectors(name, shape):
+    """
+    Initializer of the _parallel_similar_pairs() worker processes: maps the
+    parent's vectors from shared memory (no copy, nothing pickled).
+    """
+    import numpy as np
+    from multiprocessing import shared_memory
+    
+    global _shared_vectors
+    
+    memory = shared_memory.SharedMemory(name = name)
+    _shared_vectors = (memory, 
+                       np.ndarray(shape, dtype = np.float32, 
+                                  buffer = memory.buf))
+
+
+def _similar_pairs_tile(task):
+    """
+    Worker for _parallel_similar_pairs(). Compares one block of rows against
+    itself and every row after it.
+    
+    returns tuple of (left, right) numpy arrays
+    """
+    import numpy as np
+    
+    r_start, sim_amt, block_size = task
+    vectors = _shared_vectors[1]
+    
+    rows = np.arange(r_start, min(r_start + block_size, len(vectors)))
+    cols = np.arange(r_start, len(vectors))
+    lefts = [np.zeros(0, dtype = np.int64)]
+    rights = [np.zeros(0, dtype = np.int64)]
+    for left, right in _similar_pairs(vectors, 
+                                      sim_amt,
+                                      rows = rows,
+                                      cols = cols,
+                                      block_size = block_size):
+        keep = right > left
+        lefts.append(left[keep])
+        rights.append(right[keep])
+    
+    return np.concatenate(lefts), np.concatenate(rights)
+
+
+def _parallel_similar_pairs(vectors,
+                            sim_amt,
+                            workers = None,
+                            block_size = 2048):
+    """
+    _similar_pairs() of all rows of vectors (same output), with the blocks 
+    of rows shared out across workers processes. vectors is copied once 
+    into shared memory, which every worker maps, rather than being pickled
+    to each one.
+    
+    workers: (int)
+        Number of worker processes. Defaults to None (one per CPU core).
+    """
+    import os
+    import numpy as np
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if not len(vectors):
+        return
+    
+    vectors = np.ascontiguousarray(vectors, dtype = np.float32)
+    memory = shared_memory.SharedMemory(create = True, 
+                                        size = max(vectors.nbytes, 1))
+    executor = None
+    try:
+        np.ndarray(vectors.shape, dtype = np.float32, 
+                   buffer = memory.buf)[:] = vectors
+        executor = ProcessPoolExecutor(max_workers = workers,
+                                       initializer = _attach_shared_vectors,
+                                       initargs = (memory.name, 
+                                                   vectors.shape))
+        # the first blocks have the most to compare, so they go out first
+        tasks = [(r_start, sim_amt, block_size) 
+                 for r_start in range(0, len(vectors), block_size)]
+        for left, right in executor.map(_similar_pairs_tile, tasks):
+            if len(left):
+                yield left, right
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures = True)
+        memory.close()
+        memory.unlink()
+
+
+def _simhash_planes(dim, lsh_tables = 8, lsh_bits = 16, seed = 0):
+    """
+    Random hyperplanes of each of lsh_tables SimHash tables: a list of float32
+    arrays (dim x lsh_bits), the same every time for the same seed.
+    """
+    import numpy as np
+    
+    rng = np.random.default_rng(seed)
+    
+    return [rng.standard_normal((dim, lsh_bits)).astype(np.float32)
+            for table in range(lsh_tables)]
+
+
+def _simhash_codes(vectors, planes, rows = None, block_size = 2048):
+    """
+    SimHash code (uint64) of rows of vectors (all of them if rows is None)
+    for one table's planes: bit b is set if the vector is on the positive
+    side of hyperplane b.
+    """
+    import numpy as np
+    
+    if rows is None:
+        rows = np.arange(len(vectors))
+    powers = np.left_shift(np.uint64(1), 
+                           np.arange(planes.shape[1], dtype = np.uint64))
+    
+    codes = np.zeros(len(rows), dtype = np.uint64)
+    for start in range(0, len(rows), block_size):
+        side = (vectors[rows[start:start + block_size]] @ planes) > 0
+        codes[start:start + block_size] = side.astype(np.uint64) @ powers
+    
+    return codes
+
+
+def _lsh_similar_pairs(vectors,
+                       sim_amt,
+                       rows = None,
+                       cols = None,
+                       block_size = 2048,
+                       lsh_tables = 8,
+                       lsh_bits = 16,
+                       seed = 0):
+    """
+    Approximate version of _similar_pairs() (same arguments and output) for
+    when there are too many tweets to compare every pair. Uses random-
+    hyperplane locality-sensitive hashing ("SimHash"): each tweet gets an
+    lsh_bits-bit hash from which side of lsh_bits random hyperplanes its
+    vector falls on, so tweets pointing in nearly the same direction usually
+    get the same hash. Only tweets with the same hash are compared (exactly,
+    against sim_amt), and this is done for lsh_tables different sets of
+    hyperplanes so that pairs missed by one are caught by another.
+    
+    Two tweets with a cosine similarity of s end up compared with a 
+    probability of
+        1 - (1 - (1 - arccos(s) / pi) ** lsh_bits) ** lsh_tables
+    e.g., at s = .99, ~99.5% with the defaults. More tables find more pairs;
+    more bits make each comparison group smaller (faster) but find fewer. 
+    lsh_recall_report() measures this on your data. A pair found in more 
+    than one table is only yielded from the first, by keeping each table's
+    hashes (8 bytes per row per table) rather than the pairs found.
+    
+    lsh_tables: (int)
+        Number of hash tables. Defaults to 8.
+        
+    lsh_bits: (int, up to 64)
+        Bits per hash. Defaults to 16.
+        
+    seed: (int)
+        Random seed for the hyperplanes. Defaults to 0.
+    """
+    import numpy as np
+    
+    if rows is None:
+        rows = np.arange(len(vectors))
+    rows = np.asarray(rows, dtype = np.int64)
+    same = cols is None
+    cols = rows if same else np.asarray(cols, dtype = np.int64)
+    if not len(rows) or not len(cols):
+        return
+    
+    def simhash(ids, planes):
+        return _simhash_codes(vectors, planes, 
+                              rows = ids, 
+                              block_size = block_size)
+    
+    def buckets(ids, codes):
+        order = np.argsort(codes, kind = 'mergesort')
+        ids, codes = ids[order], codes[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        return codes[starts], np.split(ids, starts[1:])
+    
+    # each earlier table's hashes, by row of vectors, to tell whether a 
+    # pair was already compared there
+    earlier_codes = list()
+    
+    for planes in _simhash_planes(vectors.shape[1], 
+                                  lsh_tables = lsh_tables,
+                                  lsh_bits = lsh_bits,
+                                  seed = seed):
+        codes = np.zeros(len(vectors), dtype = np.uint64)
+        codes[rows] = simhash(rows, planes)
+        row_codes, row_buckets = buckets(rows, codes[rows])
+        if same:
+            pairs = [(bucket, None) 
+                     for bucket in row_buckets 
+                     if len(bucket) > 1]
+        else:
+            codes[cols] = simhash(cols, planes)
+            col_codes, col_buckets = buckets(cols, codes[cols])
+            found = np.searchsorted(col_codes, row_codes)
+            found = np.minimum(found, len(col_codes) - 1)
+            pairs = [(row_buckets[b], col_buckets[found[b]])
+                     for b in np.flatnonzero(col_codes[found] == row_codes)]
+        
+        for bucket_rows, bucket_cols in pairs:
+            for left, right in _similar_pairs(vectors, 
+                                              sim_amt,
+                                              rows = np.sort(bucket_rows),
+                                              cols = bucket_cols,
+                                              block_size = block_size):
+                # the same pair can turn up in more than one table
+                new = np.ones(len(left), dtype = bool)
+                for earlier in earlier_codes:
+                    new &= earlier[left] != earlier[right]
+                if new.any():
+                    yield left[new], right[new]
+        
+        earlier_codes.append(codes)
+
+
+def lsh_recall_report(data,
+                      sim_amt = .99,
+                      sample_size = 20000,
+                      lsh_tables = (4, 8, 16),
+                      lsh_bits = (12, 16, 20),
+                      parsed_col = 'parsed',
+                      seed = 0):
+    """
+    Measures how many of the over-sim_amt pairs the approximate ("lsh") 
+    method of remove_duplicates() finds, and how much faster it is, on a 
+    random sample of tweets, for each combination of lsh_tables and 
+    lsh_bits. Use it to pick settings before running remove_duplicates(data,
+    method = "lsh") on the whole dataset.
+    
+    data: (pandas DataFrame)
+        Parsed tweets (see spacy_parse()).
+        
+    sim_amt: (float)
+        Cosine similarity threshold. Defaults to .99.
+        
+    sample_size: (int)
+        Number of tweets to sample. Defaults to 20000.
+        
+    lsh_tables: (list of int)
+        Numbers of hash tables to try. Defaults to (4, 8, 16).
+        
+    lsh_bits: (list of int)
+        Numbers of bits per hash to try. Defaults to (12, 16, 20).
+        
+    parsed_col: (str)
+        column name where spaCy-parsed data is located. Defaults to 'parsed'.
+        
+    seed: (int)
+        Random seed for the sample and hyperplanes. Defaults to 0.
+        
+    Returns pandas DataFrame, one row per combination: lsh_tables, lsh_bits,
+        exact_pairs, lsh_pairs, recall, exact_seconds, lsh_seconds, speedup
+    """
+    import time
+    import pandas as pd
+    
+    sample = data[parsed_col]
+    if len(sample) > sample_size:
+        sample = sample.sample(n = sample_size, random_state = seed)
+    vectors = _tweet_vectors(sample.tolist())[0]
+    
+    def pair_set(pairs):
+        return set((i, j) 
+                   for left, right in pairs 
+                   for i, j in zip(left.tolist(), right.tolist()))
+    
+    start = time.time()
+    exact = pair_set(_similar_pairs(vectors, sim_amt))
+    exact_seconds = time.time() - start
+    
+    report = list()
+    for tables in lsh_tables:
+        for bits in lsh_bits:
+            start = time.time()
+            found = pair_set(_lsh_similar_pairs(vectors, 
+                                                sim_amt,
+                                                lsh_tables = tables,
+                                                lsh_bits = bits,
+                                                seed = seed))
+            lsh_seconds = time.time() - start
+            report.append({'lsh_tables' : tables,
+                           'lsh_bits' : bits,
+                           'exact_pairs' : len(exact),
+                           'lsh_pairs' : len(found & exact),
+                           'recall' : (len(found & exact) / len(exact) 
+                                       if exact else 1.0),
+                           'exact_seconds' : exact_seconds,
+                           'lsh_seconds' : lsh_seconds,
+                           'speedup' : exact_seconds / max(lsh_seconds, 1e-9)})
+    
+    return pd.DataFrame(report)
 
 
-def folder_json_pandas(in_folder):
+def _text_shingles(texts, shingle_size = 3):
     """
-    Imports all JSON files in in_folder and returns a single pandas DataFrame.
-    Option to pickle or CSV.
+    Breaks each text into its set of shingles: every run of shingle_size 
+    words in a row, once URLs, handles, "RT", numbers, punctuation, and case
+    are ignored. Texts shorter than shingle_size words are one shingle.
     
-    in_folder: (str)
-        Full location of folder with all JSON files. No default.
-            e.g., "C:\\Users\\nwalker\\data\\json_folder"
-            
-    pickle_out: (str)
-        Name of pickled data. Default is None (no output).
-            e.g., "tweet_pickles.txt"
+    returns shingle hashes (uint64) of every text one after the other, and 
+    offsets (int64): text i's shingles are hashes[offsets[i]:offsets[i + 1]]
+    """
+    import numpy as np
+    import pandas as pd
     
-    csv_out: (str)
-        Name of CSV file for output. Default is None (no output).
-            e.g., "all_my_tweets.csv"
+    words = (pd.Series(texts, dtype = object).fillna('').astype(str)
+             .str.replace(_DUPLICATE_TEXT_PATTERN, ' ', regex = True)
+             .str.lower()
+             .str.split())
     
-    Returns pandas DataFrame
+    shingles = list()
+    counts = np.zeros(len(words), dtype = np.int64)
+    for i, tokens in enumerate(words.tolist()):
+        if not tokens:
+            continue
+        found = {' '.join(tokens[start:start + shingle_size])
+                 for start in range(max(len(tokens) - shingle_size + 1, 1))}
+        shingles.extend(found)
+        counts[i] = len(found)
+    
+    hashes = pd.util.hash_array(np.array(shingles, dtype = object))
+    offsets = np.zeros(len(words) + 1, dtype = np.int64)
+    np.cumsum(counts, out = offsets[1:])
+    
+    return hashes.astype(np.uint64), offsets
+
+
+def _minhash_signatures(hashes, offsets, num_perm = 128, seed = 0):
     """
+    MinHash signature of each text from _text_shingles(): for each of num_perm
+    random hash functions, the smallest hash of any of the text's shingles.
+    The share of places where two signatures agree estimates the Jaccard 
+    similarity of the two texts' shingle sets.
     
-    import os
-    import pandas as pd 
-        
-    # import data
-    folder = os.listdir(in_folder)
-    folder = [i for i in folder if i[-4:] == 'json'] # remove non-JSON files
+    returns numpy array (uint32, texts x num_perm). Texts with no shingles
+    get a row of 0xFFFFFFFF.
+    """
+    import numpy as np
+    
+    n = len(offsets) - 1
+    signatures = np.full((n, num_perm), np.iinfo(np.uint32).max, 
+                         dtype = np.uint32)
+    has = np.flatnonzero(offsets[1:] > offsets[:-1])
+    if not len(has):
+        return signatures
     
-    # create list of dataframes
-    all_dfs = []
-    for file in folder:
-        json_df = file_json_pandas(in_folder + '\\' + file)
-        all_dfs.append(json_df)    
+    # xor with a random word, then multiply by a random odd word: a cheap
+    # family of hash functions that wraps around in uint64
+    rng = np.random.default_rng(seed)
+    salts = rng.integers(0, 2 ** 63, num_perm, dtype = np.uint64) * 2
+    mults = rng.integers(0, 2 ** 63, num_perm, dtype = np.uint64) * 2 + 1
     
-    df = pd.concat(all_dfs)
+    with np.errstate(over = 'ignore'):
+        for perm in range(num_perm):
+            permuted = ((hashes ^ salts[perm]) * mults[perm]) >> np.uint64(32)
+            signatures[has, perm] = np.minimum.reduceat(permuted, 
+                                                        offsets[has])
     
+    return signatures
+
+
+def _shingle_jaccard(hashes, offsets, left, right):
     """
-    # See note above on removing this data.
-    if pickle_out != None:
-        with open(pickle_out, "wb") as file:
-            try:
-                pickle.dump(df, file)
-                print("Created pickle with filename " 
-                      + pickle_out)
-            except:
-                print("Couldn't pickle.")
-                pass
-            
-    if csv_out != None:
-        try:
-            df.to_csv(csv_out)
-            print("Created CSV with filename " 
-                  + csv_out)
-        except:
-            print("Couldn't create CSV.")
-            pass            
+    Exact Jaccard similarity of the shingle sets (from _text_shingles()) of
+    texts left[k] and right[k], for every k at once.
     """
+    import numpy as np
     
-    return df
+    def gather(rows):
+        sizes = offsets[rows + 1] - offsets[rows]
+        firsts = np.repeat(offsets[rows], sizes)
+        steps = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, 
+                                                    sizes)
+        return hashes[firsts + steps], np.repeat(np.arange(len(rows)), sizes)
     
-def spacy_parse(data,
-                tweet_text = "tweet_text",
-                tweet_id = "tweet_id"):
+    left_hashes, left_pairs = gather(left)
+    right_hashes, right_pairs = gather(right)
+    both = np.concatenate([left_hashes, right_hashes])
+    pair = np.concatenate([left_pairs, right_pairs])
+    
+    # a text's shingles are all different, so a shingle showing up twice
+    # for the same pair is in both texts
+    order = np.lexsort((both, pair))
+    both, pair = both[order], pair[order]
+    twice = (both[1:] == both[:-1]) & (pair[1:] == pair[:-1])
+    common = np.bincount(pair[1:][twice], minlength = len(left))
+    
+    total = ((offsets[left + 1] - offsets[left]) 
+             + (offsets[right + 1] - offsets[right]))
+    return common / np.maximum(total - common, 1)
+
+
+def _minhash_similar_pairs(signatures,
+                           jaccard_amt,
+                           rows = None,
+                           minhash_bands = 32,
+                           block_size = 2048,
+                           shingles = None):
     """
-    Parses each tweet using spaCy v.2.0. Requires English model linked as 'en'
-    which can be installed by typing "python -m spacy download en" at the
-    command prompt (will probably require you to right-click and "run as 
-    Administrator" to be able to link).
+    MinHash counterpart of _similar_pairs(): yields (left, right) arrays of
+    rows (left before right) whose Jaccard similarity is at least 
+    jaccard_amt. Signatures are cut into minhash_bands bands and only rows
+    that agree on a whole band ("LSH banding") are compared, so the work 
+    grows with the number of near-copies rather than with every pair. Pairs
+    are checked on their exact Jaccard similarity if shingles (hashes and
+    offsets from _text_shingles(), one text per row of signatures) is 
+    given, otherwise on the similarity estimated from the signatures. The
+    pairs of a bucket are made a slice at a time and a pair that also 
+    shares an earlier band is skipped, so memory stays bounded by 
+    block_size however big a bucket is or however many pairs are found.
     
-    data (pandas DataFrame)
-        DataFrame containing at least 
+    With r = num_perm / minhash_bands rows per band, two texts with a 
+    Jaccard similarity of j are compared with a probability of
+        1 - (1 - j ** r) ** minhash_bands
+    e.g., at j = .8, ~99.99% with 128 permutations in 32 bands.
+    """
+    import numpy as np
     
-    tweet_text (str)
+    if rows is None:
+        rows = np.arange(len(signatures))
+    rows = np.asarray(rows, dtype = np.int64)
+    if len(rows) < 2:
+        return
     
-    tweet_id (str)
+    band_rows = max(signatures.shape[1] // minhash_bands, 1)
     
-    Returns nothing, but 'parsed' column is added inplace to data DataFrame.
-    This new dataset can be pickled
+    # pairs are made (and checked) about this many at a time, however big
+    # a bucket is
+    slice_pairs = block_size * 64
+    
+    for start in range(0, band_rows * minhash_bands, band_rows):
+        band = signatures[rows, start:start + band_rows]
+        if not band.size:
+            break
+        
+        # rows with the same band are next to each other once sorted
+        keys = np.ascontiguousarray(band).view(
+                   np.dtype((np.void, band.dtype.itemsize * band.shape[1])))
+        keys = keys.ravel()
+        order = np.argsort(keys, kind = 'mergesort')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1],
+                                      True])
+        sizes = np.diff(starts)
+        
+        for b in np.flatnonzero(sizes > 1).tolist():
+            bucket = np.sort(rows[order[starts[b]:starts[b + 1]]])
+            size = len(bucket)
+            step = max(1, slice_pairs // size)
+            
+            # every (i, j > i) of the bucket, for i a slice at a time
+            for i_start in range(0, size - 1, step):
+                i = np.arange(i_start, min(i_start + step, size - 1))
+                counts = size - 1 - i
+                firsts = np.cumsum(counts) - counts
+                left = np.repeat(i, counts)
+                right = (np.arange(counts.sum()) - np.repeat(firsts, counts)
+                         + left + 1)
+                left, right = bucket[left], bucket[right]
+                
+                # a pair that agrees on an earlier band came up there already
+                new = np.ones(len(left), dtype = bool)
+                for earlier in range(0, start, band_rows):
+                    columns = slice(earlier, earlier + band_rows)
+                    new &= ~np.all(signatures[left, columns]
+                                   == signatures[right, columns], axis = 1)
+                left, right = left[new], right[new]
+                
+                for block in range(0, len(left), block_size):
+                    l = left[block:block + block_size]
+                    r = right[block:block + block_size]
+                    if shingles is not None:
+                        agree = _shingle_jaccard(shingles[0], shingles[1],
+                                                 l, r)
+                    else:
+                        agree = (signatures[l] == signatures[r]).mean(axis = 1)
+                    over = agree >= jaccard_amt
+                    if over.any():
+                        yield l[over], r[over]
+
+
+def _union_find(n, pairs):
     """
+    Joins rows 0..n-1 into groups from pairs, an iterable of (left, right)
+    arrays of rows that belong together (as from _similar_pairs()). Uses
+    union by size with path compression, so it's close to linear in the
+    number of pairs however they're chained.
     
-    import spacy.lang.en
+    returns numpy array of the root row of each row's group (rows on their
+    own are their own root)
+    """
+    import numpy as np
     
-    # load parser
-    nlp = spacy.load('en')
-
-    tweets = data.loc[:, tweet_text].tolist()
-    with open('tweet_as_doc.txt', 'w', encoding = 'utf-8') as file:
-        for tweet in tweets:
-            file.write(tweet + '\n')
+    parent = list(range(n))
+    size = [1] * n
     
-    tweet_list = []
-    with open('tweet_as_doc.txt', 'r', encoding = 'utf-8') as file:
-        parsed = nlp.pipe(file)
-        for doc in parsed:
-            tweet_list.append(doc)
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
     
-    data['parsed'] = tweet_list
+    for left, right in pairs:
+        for i, j in zip(np.asarray(left).tolist(), np.asarray(right).tolist()):
+            i = find(i)
+            j = find(j)
+            if i == j:
+                continue
+            if size[i] < size[j]:
+                i, j = j, i
+            parent[j] = i
+            size[i] += size[j]
+    
+    # point every row straight at its root
+    roots = np.array(parent, dtype = np.int64)
+    while True:
+        jumped = roots[roots]
+        if np.array_equal(jumped, roots):
+            return roots
+        roots = jumped
 
 
 def remove_duplicates(data, 
@@ -469,7 +2304,18 @@ def remove_duplicates(data,
                       tweet_id = "tweet_id",
                       tweet_text = "tweet_text",
                       tweet_created_at = "tweet_created_at",
-                      remove_zeroes = True):
+                      remove_zeroes = True,
+                      rt_tweet_id = "rt_tweet_id",
+                      exact_first = True,
+                      block_size = 2048,
+                      method = "exact",
+                      lsh_tables = 8,
+                      lsh_bits = 16,
+                      jaccard_amt = .8,
+                      shingle_size = 3,
+                      minhash_perm = 128,
+                      minhash_bands = 32,
+                      workers = 1):
     
     """
     Remove tweets that meet a specific threshold of similarity (based on cosine
@@ -502,6 +2348,65 @@ def remove_duplicates(data,
         Controls whether or not tweets with no semantic information are left
         in the reduced dataset or discarded as duplicates (of gibberish).
         Defaults to True.
+        
+    rt_tweet_id: (str)
+        Column name in data for the ID of the retweeted tweet, blank if the
+        tweet isn't a retweet. Ignored if data doesn't have it. Defaults to
+        "rt_tweet_id"
+        
+    exact_first: (bool)
+        Before comparing any vectors, group retweets of the same tweet and
+        tweets whose text is identical once URLs, handles, "RT", numbers,
+        and punctuation are ignored (case is not). Only the earliest tweet
+        of each of these groups goes on to the (much slower) similarity 
+        comparisons; the rest follow it into whatever group it ends up in. 
+        Defaults to True.
+        
+    block_size: (int)
+        Similarities are worked out block_size x block_size tweets at a time
+        with matrix multiplication. Bigger is faster, up to a point, but uses
+        more memory (4 * block_size ** 2 bytes). Defaults to 2048.
+        
+    method: (str)
+        "exact" compares every pair of tweets. "lsh" only compares tweets 
+        that land in the same bucket of a random-hyperplane hash (see 
+        _lsh_similar_pairs()), which is much faster on millions of tweets 
+        but can miss a few matches. Check how many with lsh_recall_report().
+        "minhash" doesn't use spaCy at all: it matches tweets on the words 
+        they share (see jaccard_amt), so it only catches copy-and-paste 
+        duplicates, but is far cheaper. Defaults to "exact".
+        
+    lsh_tables: (int)
+        With method = "lsh", number of hash tables. More finds more matches
+        but is slower. Defaults to 8.
+        
+    lsh_bits: (int)
+        With method = "lsh", bits per hash. More is faster but finds fewer
+        matches. Defaults to 16.
+        
+    jaccard_amt: (float)
+        With method = "minhash", Jaccard similarity threshold (share of 
+        shingles in common) of tweets. Defaults to .8.
+        
+    shingle_size: (int)
+        With method = "minhash", number of words in a row in each shingle.
+        Defaults to 3.
+        
+    minhash_perm: (int)
+        With method = "minhash", length of each tweet's MinHash signature.
+        More estimates Jaccard similarity more closely but is slower. 
+        Defaults to 128.
+        
+    minhash_bands: (int)
+        With method = "minhash", number of bands signatures are cut into.
+        More finds more matches but is slower (see _minhash_similar_pairs()).
+        Defaults to 32.
+        
+    workers: (int)
+        With method = "exact", number of processes the blocks of 
+        similarities are shared out across (the tweet vectors go in shared
+        memory, so each process doesn't get its own copy). None uses every
+        CPU core. Defaults to 1.
             
     Returns list of pandas DataFrames:
         [0]: duplicate tweets removed
@@ -510,25 +2415,52 @@ def remove_duplicates(data,
     """
     
     import numpy as np
-    import time
     import pandas as pd
     import logging
     
     logger = logging.getLogger()
+    
+    if method not in ("exact", "lsh", "minhash"):
+        raise ValueError("method must be 'exact', 'lsh', or 'minhash'.")
         
+    stage = _Stage('remove_duplicates', unit = 'tweets')
+    
     # set index to column, set tweet_id to index
     data.loc[:, 'index_col'] = data.index
     data.set_index(tweet_id, inplace=True, drop=False)
     data.sort_index(inplace=True)    
     
     # parse tweets
-    if not 'parsed' in data.columns:
+    if method != "minhash" and not 'parsed' in data.columns:
         spacy_parse(data,
                     tweet_text = tweet_text,
-                    tweet_id = tweet_id)
+                    tweet_id = tweet_id,
+                    compact = True)
+    
+    n = len(data)
     
     '''
-    Create dictionary of non-zero .vector_norm tweets:
+    Exact duplicates and retweets: reps holds the position of each tweet's
+    representative, the earliest tweet of its group. Only representatives
+    get compared below; the rest follow them into whatever group they end
+    up in.
+    '''
+    if exact_first:
+        reps = _exact_duplicate_groups(data,
+                                       tweet_text = tweet_text,
+                                       tweet_created_at = tweet_created_at,
+                                       rt_tweet_id = rt_tweet_id)
+    else:
+        reps = np.arange(n)
+    compare = np.flatnonzero(reps == np.arange(n))
+    if exact_first:
+        logger.info("Exact duplicates/retweets: " 
+                    + repr(n - len(compare)) 
+                    + " tweets set aside, " + repr(len(compare)) 
+                    + " left to compare.")
+    
+    '''
+    Create matrix of non-zero .vector_norm tweets:
     There are likely tweets that have a vector_norm of 0. We'll take 
     them out because we divide by vector_norm, so if it is zero, we will get 
     NaN, which we don't want. This is 12x faster than using spaCy's 
@@ -543,362 +2475,596 @@ def remove_duplicates(data,
     in v. 2.0 have given them their own vectors. This is good, but makes things
     tricky here so we will take them out.
     
-    The structure of this dictionary is:
-        keys: tweet IDs
-        0: None -- we will use this to identify its matched group
-        1: (int) -- this is the length of the tweet
-        2: vector -- this is the .vector for each tweet
-        3: (int) -- this is the .vector_norm for each tweet
+    Each vector is divided by its .vector_norm right away, so the cosine
+    similarity of two tweets is just the dot product of their rows, and
+    whole blocks of tweets are compared with one matrix multiplication 
+    (see _similar_pairs()). vec_pos holds the position (in data) of the
+    tweet in each row of vectors.
     '''
     
-    id_list = list(data.index)
-    tweet_lens = list()
-    zeroes = list()
-    tweet_vector_dict = dict()
-
-    for tweet in id_list:
-        keepers = [token.vector 
-                   for token in data.loc[tweet, 'parsed']
-                   if not (thing_to_remove(token)
-                           or token.lemma_[0] == '@')] # remove Twitter handles
-        summed = sum(keepers)
-        norm = np.sqrt(np.dot(summed, summed))
-        if norm == 0:
-            zeroes.append(tweet)
-        else:
-            tweet_vector_dict[tweet] = list(['',
-                                             len(keepers),
-                                             summed,
-                                             norm])
-        
+    if method == "minhash":
+        # tweets with no words left are the "zero" tweets here
+        hashes, offsets = _text_shingles(data[tweet_text].to_numpy()[compare],
+                                         shingle_size = shingle_size)
+        signatures = _minhash_signatures(hashes, 
+                                         offsets, 
+                                         num_perm = minhash_perm)
+        nonzero = offsets[1:] > offsets[:-1]
+        signatures = signatures[nonzero]
+        shingles = (hashes, np.r_[offsets[:-1][nonzero], offsets[-1]])
+    else:
+        parsed = data['parsed'].tolist()
+        vectors, nonzero = _tweet_vectors([parsed[i] 
+                                           for i in compare.tolist()])
+    vec_pos = compare[nonzero]
+    
+    # exact duplicates of a zero tweet are zero too
+    zero = np.zeros(n, dtype = bool)
+    zero[compare[~nonzero]] = True
+    zero = zero[reps]
+    
+    if method == "minhash":
+        pairs = _minhash_similar_pairs(signatures,
+                                       jaccard_amt,
+                                       minhash_bands = minhash_bands,
+                                       block_size = block_size,
+                                       shingles = shingles)
+    elif method == "lsh":
+        pairs = _lsh_similar_pairs(vectors, 
+                                   sim_amt,
+                                   block_size = block_size,
+                                   lsh_tables = lsh_tables,
+                                   lsh_bits = lsh_bits)
+    elif workers != 1 and len(vectors) > block_size:
+        pairs = _parallel_similar_pairs(vectors, 
+                                        sim_amt,
+                                        workers = workers,
+                                        block_size = block_size)
+    else:
+        pairs = _similar_pairs(vectors, 
+                               sim_amt,
+                               block_size = block_size)
+    
     '''
-    Here, we create a list of tweets (by length) in advance so we don't have to 
-    re-index and eat up computation time on the back end.
+    Grouping: every pair of tweets over sim_amt is joined, along with every
+    tweet and its exact-duplicate representative, so a group is everything
+    connected by a chain of matches no matter how long the tweets are or
+    in what order they come up. Zero tweets never match anything, so they
+    (and their exact duplicates) can only end up in a group of their own.
     '''
+    counted = [0]
     
-    len_list = [tweet_vector_dict[tw][1] for tw in tweet_vector_dict] 
+    def data_pairs():
+        yield np.arange(n), reps
+        for left, right in pairs:
+            counted[0] += len(left)
+            yield vec_pos[left], vec_pos[right]
     
-    tweet_lens = list()
+    roots = _union_find(n, data_pairs())
+    in_group = np.bincount(roots, minlength = n)[roots] > 1
+    
+    group_count = len(np.unique(roots[in_group]))
+    logger.info("Grouping: " + repr(counted[0]) + " pairs over "
+                + repr(jaccard_amt if method == "minhash" else sim_amt) 
+                + ", " + repr(int(in_group.sum())) + " tweets matched into "
+                + repr(group_count) + " groups.")
     
-    for leng in set(len_list):
-        tweet_lens.append(
-                {t: list([tweet_vector_dict[t][0], 
-                          tweet_vector_dict[t][1], 
-                          tweet_vector_dict[t][2], 
-                          tweet_vector_dict[t][3]]) 
-                    for t in tweet_vector_dict 
-                    if tweet_vector_dict[t][1] == leng})
-            
-            
-            
-            
-            
     '''
-    Comparison 1: same-length vs same-length
+    The earliest tweet (by tweet_created_at, ties going to the first row) of
+    each group is kept, everything else in the group is removed. This is a
+    single sort by group then date.
     '''
-    itercounter = 0
-    itertime = time.time()
-    
-    for leng in tweet_lens:
-        comp_set = set(list(leng.keys()))
-        compiter = list(comp_set)
-        
-        for id1 in compiter:
-            comp_set.discard(id1)
-            if leng[id1][0] != '': # test if it's already matched
-                continue 
-            '''
-            This next step does our copmutation for each non-matched pair:
-            Numerator: dot product(id1.vector, id2.vector)
-            Denominator: id1.vector_norm * id2.vector_norm
-            '''
-            comp_list = list(comp_set)
-            comp_scores = [[id2, (np.dot(leng[id1][2], leng[id2][2]) / 
-                                 (leng[id1][3] * leng[id2][3]))] 
-                            for id2 in comp_list]
-        
-            # list of ids for tweets with similarity over sim_amt
-            ids_comp = [k 
-                        for k, v in comp_scores 
-                        if v > sim_amt]
-            
-            # for every match, change the "matched group" to id1
-            for id2 in ids_comp:
-                leng[id2][0] = id1
-                leng[id1][0] = id1
-                comp_set.difference_update(ids_comp)
-
-        #log
-        itercounter += 1
-        now = time.time() - itertime
-        hours = int(np.floor(now / 60 / 60))
-        minutes = int(np.floor((now - (hours * 60 * 60)) / 60)) 
-        seconds = int(np.floor(now - ((hours * 60 * 60) + (minutes * 60))))    
-        logger.info("Comparison 1: Done with round " 
-                    + repr(itercounter) + " of " 
-                    + repr(len(tweet_lens)) + " at "
-                    + repr(hours) + " hours, " 
-                    + repr(minutes) + " minutes, and " 
-                    + repr(seconds) + " seconds.")       
+    created = data[tweet_created_at].to_numpy()
+    order = pd.DataFrame({'root' : roots,
+                          'created' : created,
+                          'position' : np.arange(n)}
+                         ).sort_values(['root', 'created', 'position'],
+                                       kind = 'mergesort')
+    first = order['position'].to_numpy()[
+                ~order.duplicated('root').to_numpy()]
+    is_first = np.zeros(n, dtype = bool)
+    is_first[first] = True
     
+    to_remove = in_group & ~is_first
+    if remove_zeroes == True:
+        to_remove |= zero
+    
+    reduced_df = data.iloc[np.flatnonzero(~to_remove)]
+    removed_df = data.iloc[np.flatnonzero(to_remove)]
+    stage.done(n, 
+               method = method, 
+               pairs = counted[0], 
+               groups = group_count,
+               removed = len(removed_df))
     
     '''
-    Comparison 2: "matched group" by +/- 2 length window of unmatched tweets
+    The last item is the dup_df, which is a pandas DataFrame of tweet IDs,
+    text, and group-identifiers. This can be used to assess sim_amt.
     '''
+    grouped = np.flatnonzero(in_group)
+    dup_df = pd.DataFrame(data.iloc[grouped][[tweet_id, tweet_text]])
+    dup_df['group'] = np.unique(roots[grouped], return_inverse = True)[1]
+    dup_df = dup_df.iloc[np.argsort(dup_df['group'].to_numpy(), 
+                                    kind = 'mergesort')]
+    dup_df.set_index('group', inplace=True)
+        
+    return list([reduced_df, removed_df, dup_df])
     
-    itercounter = -1
-    m_1 = set()
-    m_2 = set()
-    itertime = time.time()
-
-    matched_list = list()
-    for leng in tweet_lens:
-        matched_list.append(set([v[0] 
-                                for k, v in leng.items() 
-                                if v[0] != '']))
-            # add to list if "matched group" != ''
-
-    for leng in tweet_lens:
-        itercounter += 1
-        '''
-        Set up comparison windows of +/- 2 around each length. 
-        '''
-        if itercounter == 1:
-            m_1 = set([k 
-                       for k, v in tweet_lens[0].items() 
-                       if v[0] == ''])
-        if itercounter > 1:
-            m_2 = set([k 
-                       for k, v in tweet_lens[itercounter - 2].items() 
-                       if v[0] == ''])
-            m_1 = set([k 
-                       for k, v in tweet_lens[itercounter - 1].items() 
-                       if v[0] == ''])
-                
-        if itercounter < (len(tweet_lens) - 2):
-            p_2 = set([k 
-                       for k, v in tweet_lens[itercounter + 2].items() 
-                       if v[0] == ''])
-            p_1 = set([k 
-                       for k, v in tweet_lens[itercounter + 1].items() 
-                       if v[0] == ''])
-        if itercounter == (len(tweet_lens) - 2):
-            p_1 = set([k 
-                       for k, v in tweet_lens[len(tweet_lens) - 2].items() 
-                       if v[0] == ''])
-            p_2 = set()
-        if itercounter == (len(tweet_lens) - 1):
-            p_1 = set()
-            p_2 = set()
-                            
-        '''
-        Check matched groups versus comparison window. The similarity
-        calculation is the same as in Comparison 1, it just doesn't easily
-        fit on one/two/three lines.
-        '''
-                            
-        for id1 in matched_list[itercounter]:
-            # comparison for minus 2
-            m_2_list = list(m_2)
-            
-            comp_scores = [[id2, (np.dot(leng[id1][2], 
-                                     tweet_lens[itercounter - 2][id2][2]) /
-                                 (leng[id1][3] * 
-                                     tweet_lens[itercounter - 2][id2][3]))] 
-                                         for id2 in m_2_list]
-        
-            ids_comp = [k 
-                        for k, v in comp_scores 
-                        if v > sim_amt]
-            # update "matched group" in new matches (minus 2)
-            for id2 in ids_comp:
-                tweet_lens[itercounter - 2][id2][0] = id1
-                m_2.difference_update(ids_comp)
-            
-            
-            # comparison for minus 1
-            m_1_list = list(m_1)
-            comp_scores = [[id2, (np.dot(leng[id1][2], 
-                                     tweet_lens[itercounter - 1][id2][2]) / 
-                                 (leng[id1][3] *
-                                      tweet_lens[itercounter - 1][id2][3]))] 
-                                          for id2 in m_1_list]
-        
-            ids_comp = [k 
-                        for k, v in comp_scores 
-                        if v > sim_amt]
-            # update "matched group" in new matches (minus 1)
-            for id2 in ids_comp:
-                tweet_lens[itercounter - 1][id2][0] = id1
-                m_1.difference_update(ids_comp)
-            
-            
-            # comparison for plus 1
-            p_1_list = list(p_1)
-            comp_scores = [[id2, (np.dot(leng[id1][2], 
-                                     tweet_lens[itercounter + 1][id2][2]) / 
-                                 (leng[id1][3] *
-                                     tweet_lens[itercounter + 1][id2][3]))] 
-                                         for id2 in p_1_list]
-                
-            ids_comp = [k 
-                        for k, v in comp_scores 
-                        if v > sim_amt]
-            # update "matched group" in new matches (plus 1)
-            for id2 in ids_comp:
-                tweet_lens[itercounter + 1][id2][0] = id1
-                p_1.difference_update(ids_comp)
-            
+'''
+Streaming duplicate removal
+'''
+
+class DuplicateState(object):
+    """
+    What remove_duplicates_stream() remembers about every tweet it has seen,
+    kept in folder path so that each new batch of tweets only has to be
+    compared against it rather than re-running remove_duplicates() on all of
+    history.
+    
+    path holds state.json (settings and the list of segments), groups.npy,
+    and a folder for every batch ("segment") with the batch's unit-length
+    vectors (see _tweet_vectors()), tweet IDs, and creation dates -- plus,
+    with method = "lsh", each vector's SimHash codes sorted by code so 
+    matching buckets can be looked up without reading the rest. Rows are
+    numbered across segments in order, and groups.npy holds, for every row,
+    the row of the tweet that was kept for its group (itself if it was kept
+    and nothing has matched it). Arrays are memory-mapped, so loading the 
+    state costs next to nothing however big it gets.
+    """
+    
+    _ARRAYS = ('vectors', 'tweet_ids', 'created')
+    
+    def __init__(self, path):
+        import json
+        import os
+        import numpy as np
+        
+        self.path = path
+        self.settings = dict()
+        self.segments = list()
+        self.groups = np.zeros(0, dtype = np.int64)
+        
+        state_file = os.path.join(path, 'state.json')
+        if os.path.exists(state_file):
+            with open(state_file, 'r', encoding = 'utf-8') as file:
+                state = json.load(file)
+            self.settings = state['settings']
+            self.segments = [self._load_segment(segment) 
+                             for segment in state['segments']]
+            self.groups = np.load(os.path.join(path, state['groups']),
+                                  mmap_mode = 'r')
+    
+    def __len__(self):
+        return len(self.groups)
+    
+    def _load_segment(self, name):
+        import os
+        import numpy as np
+        
+        segment = {'name' : name}
+        for array in os.listdir(os.path.join(self.path, name)):
+            segment[array[:-len('.npy')]] = np.load(
+                                                os.path.join(self.path, 
+                                                             name, 
+                                                             array),
+                                                mmap_mode = 'r')
+        return segment
+    
+    def starts(self):
+        """
+        First row of each segment (plus the total number of rows at the end).
+        """
+        import numpy as np
+        
+        return np.cumsum([0] + [len(segment['vectors']) 
+                                for segment in self.segments])
+    
+    def column(self, name, rows):
+        """
+        Values of array name ('tweet_ids' or 'created') for rows.
+        """
+        import numpy as np
+        
+        rows = np.asarray(rows, dtype = np.int64)
+        starts = self.starts()
+        which = np.searchsorted(starts, rows, side = 'right') - 1
+        parts = [self.segments[s][name][rows[which == s] - starts[s]]
+                 for s in range(len(self.segments))]
+        values = np.concatenate([part for part in parts if len(part)] 
+                                or [np.zeros(0)])
+        
+        # put them back in the order of rows
+        order = np.argsort(which, kind = 'mergesort')
+        out = np.empty_like(values)
+        out[order] = values
+        return out
+    
+    def similar_pairs(self, vectors, sim_amt, block_size = 2048):
+        """
+        Finds every pair of a row of vectors (new tweets, unit length) and a
+        row of the state with a cosine similarity over sim_amt.
+        
+        returns generator of (new, old) numpy arrays of rows
+        """
+        import numpy as np
+        
+        starts = self.starts()
+        method = self.settings.get('method', 'exact')
+        if method == 'lsh':
+            planes = _simhash_planes(vectors.shape[1],
+                                     lsh_tables = self.settings['lsh_tables'],
+                                     lsh_bits = self.settings['lsh_bits'],
+                                     seed = self.settings['seed'])
+            codes = [_simhash_codes(vectors, table, block_size = block_size)
+                     for table in planes]
+        
+        for s, segment in enumerate(self.segments):
+            old_vectors = segment['vectors']
             
-            # comparison for plus 2
-            p_2_list = list(p_2)
-            comp_scores = [[id2, (np.dot(leng[id1][2], 
-                                     tweet_lens[itercounter + 2][id2][2]) / 
-                                 (leng[id1][3] *
-                                     tweet_lens[itercounter + 2][id2][3]))] 
-                                         for id2 in p_2_list]
-            ids_comp = [k 
-                        for k, v in comp_scores 
-                        if v > sim_amt]
-            # update "matched group" in new matches (plus 2)
-            for id2 in ids_comp:
-                tweet_lens[itercounter + 2][id2][0] = id1
-                p_2.difference_update(ids_comp)
-        
-        # logging
-        now = time.time() - itertime
-        hours = int(np.floor(now / 60 / 60))
-        minutes = int(np.floor((now - (hours * 60 * 60)) / 60)) 
-        seconds = int(np.floor(now - ((hours * 60 * 60) + (minutes * 60))))    
-        logger.info("Comparison 2: Done with round " 
-                    + repr(itercounter + 1) + " of " 
-                    + repr(len(tweet_lens)) + " at "
-                    + repr(hours) + " hours, " 
-                    + repr(minutes) + " minutes, and " 
-                    + repr(seconds) + " seconds.")
+            if method != 'lsh':
+                # every earlier tweet, a block at a time
+                for start in range(0, len(old_vectors), block_size):
+                    block = np.asarray(old_vectors[start:start + block_size])
+                    for new_start in range(0, len(vectors), block_size):
+                        new_block = vectors[new_start:new_start + block_size]
+                        sims = new_block @ block.T
+                        i, j = np.nonzero(sims > sim_amt)
+                        if len(i):
+                            yield i + new_start, j + start + starts[s]
+                continue
             
-    '''
-    Comparison 3: Matches vs matches
-    '''
-                
-    # update/replace tweet_vector_dict with new match definitions
-    tweet_vector_dict = {}
-    for leng in tweet_lens:
-        tweet_vector_dict.update(leng)
-        
-    # create list of all ids for "matched groups"
-    matches_set = set([v[0] for k, v in tweet_vector_dict.items()])
-    matches_set.discard('')
-    
-    matches_list = list(matches_set)
-    
-    itercounter = 0
-    itertime = time.time()
-    
-    for match in matches_list:
-        matches_set.discard(set([match])) # don't check same-vs-same
-        matches_set_list = list(matches_set) # updated list of to-check ids
-        
-        # make comparisons, as before
-        comp_scores = [[id2, (np.dot(tweet_vector_dict[match][2], 
-                                 tweet_vector_dict[id2][2]) /
-                             (tweet_vector_dict[match][3] *
-                                 tweet_vector_dict[id2][3]))]
-                                     for id2 in matches_set_list]
-        ids_comp = [k 
-                    for k, v in comp_scores 
-                    if v > sim_amt]
+            # only look at the buckets the new tweets fall in
+            seen = set()
+            for table in range(len(planes)):
+                sorted_codes = segment['codes'][table]
+                code_rows = segment['code_rows'][table]
+                lo = np.searchsorted(sorted_codes, codes[table], side = 'left')
+                hi = np.searchsorted(sorted_codes, codes[table], side = 'right')
+                sizes = hi - lo
+                if not sizes.sum():
+                    continue
+                new = np.repeat(np.arange(len(vectors)), sizes)
+                old = code_rows[np.repeat(lo, sizes) 
+                                + np.arange(sizes.sum()) 
+                                - np.repeat(np.cumsum(sizes) - sizes, sizes)]
                 
-        # update tweet_vector_dict for matched values
-        for id2 in ids_comp:
-            tweet_vector_dict[id2][0] = match
-            for k, v in tweet_vector_dict.items():
-                if v[0] == id2:
-                    v[0] = match
-        matches_set.difference_update(ids_comp)
-        
-        # logging
-        itercounter += 1                   
-        now = time.time() - itertime
-        hours = int(np.floor(now / 60 / 60))
-        minutes = int(np.floor((now - (hours * 60 * 60)) / 60)) 
-        seconds = int(np.floor(now - ((hours * 60 * 60) + (minutes * 60))))    
-        logger.info("Comparison 3: Done with round " 
-                    + repr(itercounter) + " of " 
-                    + repr(len(matches_list)) + " at "
-                    + repr(hours) + " hours, " 
-                    + repr(minutes) + " minutes, and " 
-                    + repr(seconds) + " seconds.")
+                for start in range(0, len(new), block_size):
+                    n = new[start:start + block_size]
+                    o = old[start:start + block_size]
+                    sims = np.einsum('ij,ij->i', vectors[n], old_vectors[o])
+                    over = sims > sim_amt
+                    keys = (n[over] * np.int64(len(old_vectors)) 
+                            + o[over]).tolist()
+                    fresh = np.array([key not in seen for key in keys], 
+                                     dtype = bool)
+                    seen.update(keys)
+                    if fresh.any():
+                        yield n[over][fresh], o[over][fresh] + starts[s]
+    
+    def add(self, vectors, tweet_ids, created, groups, settings):
+        """
+        Saves a batch as a new segment and groups (int64, the kept row of 
+        every row of the state, old and new) as the new group table, then 
+        updates state.json. state.json is replaced last, so a batch is 
+        either all there or (if something goes wrong) not there at all.
+        """
+        import json
+        import os
+        import uuid
+        import numpy as np
+        
+        os.makedirs(self.path, exist_ok = True)
+        name = 'seg-' + uuid.uuid4().hex
+        tmp_path = os.path.join(self.path, '.' + name)
+        os.makedirs(tmp_path)
+        
+        arrays = {'vectors' : np.asarray(vectors, dtype = np.float32),
+                  'tweet_ids' : tweet_ids,
+                  'created' : created}
+        if settings['method'] == 'lsh':
+            planes = _simhash_planes(vectors.shape[1],
+                                     lsh_tables = settings['lsh_tables'],
+                                     lsh_bits = settings['lsh_bits'],
+                                     seed = settings['seed'])
+            codes = np.array([_simhash_codes(vectors, table) 
+                              for table in planes], dtype = np.uint64)
+            code_rows = np.argsort(codes, axis = 1, kind = 'mergesort')
+            arrays['codes'] = np.take_along_axis(codes, code_rows, axis = 1)
+            arrays['code_rows'] = code_rows.astype(np.int64)
+        for array, values in arrays.items():
+            np.save(os.path.join(tmp_path, array + '.npy'), values,
+                    allow_pickle = False)
+        os.replace(tmp_path, os.path.join(self.path, name))
+        
+        groups_file = 'groups-' + uuid.uuid4().hex + '.npy'
+        np.save(os.path.join(self.path, groups_file), 
+                np.asarray(groups, dtype = np.int64))
+        
+        with open(os.path.join(self.path, 'state.json.tmp'), 'w',
+                  encoding = 'utf-8') as file:
+            json.dump({'settings' : settings,
+                       'segments' : [segment['name'] 
+                                     for segment in self.segments] + [name],
+                       'groups' : groups_file}, file)
+        os.replace(os.path.join(self.path, 'state.json.tmp'),
+                   os.path.join(self.path, 'state.json'))
+        
+        old_groups = [i for i in os.listdir(self.path) 
+                      if i.startswith('groups-') and i != groups_file]
+        for old in old_groups:
+            os.remove(os.path.join(self.path, old))
+        
+        self.__init__(self.path)
+
+
+def remove_duplicates_stream(data,
+                             state_path,
+                             sim_amt = .99,
+                             tweet_id = "tweet_id",
+                             tweet_text = "tweet_text",
+                             tweet_created_at = "tweet_created_at",
+                             remove_zeroes = True,
+                             rt_tweet_id = "rt_tweet_id",
+                             exact_first = True,
+                             block_size = 2048,
+                             method = "lsh",
+                             lsh_tables = 8,
+                             lsh_bits = 16):
+    """
+    remove_duplicates() for tweets that keep coming in (e.g., one day at a 
+    time). Each batch (data) is compared against itself and against what 
+    is remembered of every earlier batch in state_path (see DuplicateState),
+    then added to it. With method = "lsh" (the default), only the matching
+    buckets of earlier batches are read, so the time taken depends on the 
+    size of the batch rather than on all of history. With method = "exact" 
+    every earlier vector is still compared, straight from the memory-mapped 
+    state: each batch of b tweets costs b x (every tweet seen so far) 
+    similarities, so batches keep getting slower as history grows.
+    
+    Tweets are grouped as in remove_duplicates(), except that a tweet that
+    was kept in an earlier batch stays kept: new tweets that match an 
+    earlier group are removed, even if they are older than the tweet that
+    was kept for it. If a new tweet joins two earlier groups together, the 
+    older of their kept tweets is the one the group is under from then on.
+    
+    data: (pandas DataFrame)
+        New tweets, as for remove_duplicates().
+        
+    state_path: (str)
+        Folder of the saved state. Created by the first batch.
+            e.g., state_path = "C:\\\\Users\\\\nwalker\\\\data\\\\dup_state"
         
+    method: (str)
+        "exact" or "lsh" (see remove_duplicates()). Must be the same for 
+        every batch in the same state_path, as must lsh_tables and lsh_bits.
+        Defaults to "lsh"; "exact" only suits a history that stays small.
+        
+    Everything else is as for remove_duplicates().
+            
+    Returns list of pandas DataFrames (of the new tweets only):
+        [0]: duplicate tweets removed
+        [1]: removed duplicate tweets
+        [2]: new tweets in a group, with the group set to the ID of the tweet 
+            kept for it (which may be from an earlier batch)
+    """
+    import numpy as np
+    import pandas as pd
+    
+    if method not in ("exact", "lsh"):
+        raise ValueError("method must be 'exact' or 'lsh'.")
+    settings = {'method' : method,
+                'sim_amt' : sim_amt,
+                'lsh_tables' : lsh_tables,
+                'lsh_bits' : lsh_bits,
+                'seed' : 0}
+    
+    state = DuplicateState(state_path)
+    if state.settings:
+        differs = [k for k in ('method', 'lsh_tables', 'lsh_bits')
+                   if state.settings[k] != settings[k]]
+        if differs:
+            raise ValueError("state_path was made with different "
+                             + ", ".join(differs) + ": " 
+                             + repr(state.settings))
+    
+    stage = _Stage('remove_duplicates_stream', unit = 'tweets')
+    
+    # set index to column, set tweet_id to index
+    data.loc[:, 'index_col'] = data.index
+    data.set_index(tweet_id, inplace=True, drop=False)
+    data.sort_index(inplace=True)    
+    
+    # parse tweets
+    if not 'parsed' in data.columns:
+        spacy_parse(data,
+                    tweet_text = tweet_text,
+                    tweet_id = tweet_id,
+                    compact = True)
+    
+    n = len(data)
+    
+    if exact_first:
+        reps = _exact_duplicate_groups(data,
+                                       tweet_text = tweet_text,
+                                       tweet_created_at = tweet_created_at,
+                                       rt_tweet_id = rt_tweet_id)
+    else:
+        reps = np.arange(n)
+    compare = np.flatnonzero(reps == np.arange(n))
+    
+    parsed = data['parsed'].tolist()
+    vectors, nonzero = _tweet_vectors([parsed[i] 
+                                       for i in compare.tolist()])
+    vec_pos = compare[nonzero]
+    
+    zero = np.zeros(n, dtype = bool)
+    zero[compare[~nonzero]] = True
+    zero = zero[reps]
+    
+    if len(state) and len(vectors) and (state.segments[0]['vectors'].shape[1]
+                                        != vectors.shape[1]):
+        raise ValueError("Tweet vectors don't have the same number of "
+                         "dimensions as the ones in state_path.")
+    
     '''
-    Post-comparison: Match up ids in original DataFrame
-
-    We'll create a dictionary now with the following parameters:
-    key: tweet id
-        0: group id
-        1: tweet text
-        2: tweet created at date
-        3: boolean for "is first date in group"
-    This dictionary consists of all tweets that have groups
+    Grouping: new tweets are numbered 0..n-1 (by position in data) and the 
+    earlier tweets they touch n and up, with each earlier tweet joined to
+    the tweet kept for its group, so the union-find only ever sees this
+    batch and the part of history it matches.
     '''
-    has_match = set([k 
-                     for k, v in tweet_vector_dict.items() 
-                     if v[0] != ''])
-    is_match = list(set([v[0] 
-                    for k, v in tweet_vector_dict.items() 
-                    if v[0] != '']))
-    match_dict = {k : [v[0], 
-                       data.loc[k, tweet_text], 
-                       data.loc[k, tweet_created_at],
-                       False]
-                  for k, v in tweet_vector_dict.items() 
-                  if k in has_match}
+    if method == "lsh":
+        new_pairs = list(_lsh_similar_pairs(vectors, 
+                                            sim_amt,
+                                            block_size = block_size,
+                                            lsh_tables = lsh_tables,
+                                            lsh_bits = lsh_bits))
+    else:
+        new_pairs = list(_similar_pairs(vectors, 
+                                        sim_amt,
+                                        block_size = block_size))
+    old_pairs = list()
+    if len(state) and len(vectors):
+        old_pairs = list(state.similar_pairs(vectors, 
+                                             sim_amt, 
+                                             block_size = block_size))
+    
+    old_rows = np.concatenate([np.zeros(0, dtype = np.int64)] 
+                              + [old for new, old in old_pairs])
+    old_rows = np.union1d(old_rows, np.asarray(state.groups)[old_rows])
+    
+    def local_pairs():
+        yield np.arange(n), reps
+        for left, right in new_pairs:
+            yield vec_pos[left], vec_pos[right]
+        for new, old in old_pairs:
+            yield vec_pos[new], n + np.searchsorted(old_rows, old)
+        yield (n + np.arange(len(old_rows)), 
+               n + np.searchsorted(old_rows, 
+                                   np.asarray(state.groups)[old_rows]))
+    
+    roots = _union_find(n + len(old_rows), local_pairs())
+    new_roots = roots[:n]
+    in_group = np.bincount(roots, minlength = len(roots))[new_roots] > 1
     
     '''
-    From here, we're just looping through each of the matched groups and making
-    a list of two groups for each item: [id, date]. We're then sorting that 
-    group by its date and adding the first item (first date) to a list of 
-    tweets to keep.
+    Which tweet is kept for each group: the oldest of the tweets kept for the
+    earlier groups in it, or, for groups of only new tweets, the oldest new
+    tweet.
     '''
+    kept_rows = np.unique(np.asarray(state.groups)[old_rows])
+    kept_local = n + np.searchsorted(old_rows, kept_rows)
+    keeper = dict()
+    if len(kept_rows):
+        kept = pd.DataFrame({'root' : roots[kept_local],
+                             'created' : state.column('created', kept_rows),
+                             'row' : kept_rows}
+                            ).sort_values(['root', 'created', 'row'],
+                                          kind = 'mergesort')
+        kept = kept[~kept.duplicated('root')]
+        keeper = dict(zip(kept['root'].tolist(), kept['row'].tolist()))
     
-    by_group = list()
-    first_dates = list()
-    
-    for group in is_match:
-        group_list = [[k, v[2]] 
-                      for k, v in match_dict.items() 
-                      if v[0] == group]
-        by_group.append([k[0] for k in group_list])
-        min_date = sorted(group_list, key = lambda x: x[1], reverse = False)[0]
-        first_dates.append(min_date[0])
-
-    tweets_to_remove = has_match.difference(set(first_dates))
+    created = data[tweet_created_at].to_numpy(dtype = 'datetime64[ns]')
+    order = pd.DataFrame({'root' : new_roots,
+                          'created' : created,
+                          'position' : np.arange(n)}
+                         ).sort_values(['root', 'created', 'position'],
+                                       kind = 'mergesort')
+    first = order['position'].to_numpy()[
+                ~order.duplicated('root').to_numpy()]
     
-    if remove_zeroes == True:
-        tweets_to_remove.update(set(zeroes))
+    # new rows of the state go after the old ones, in order of vec_pos
+    m = len(state)
+    state_row = np.full(n, -1, dtype = np.int64)
+    state_row[vec_pos] = m + np.arange(len(vec_pos))
     
-    tweets_to_keep = set(id_list).difference(tweets_to_remove)
+    # groups of only new tweets are kept under a new tweet, which isn't in
+    # the state if its vector is zero (group_row -1, with only exact 
+    # duplicates in the group, none of which are in the state either)
+    is_first = np.zeros(n, dtype = bool)
+    group_row = dict()
+    kept_position = dict()
+    for position in first.tolist():
+        root = int(new_roots[position])
+        if root in keeper:
+            group_row[root] = keeper[root]
+        else:
+            is_first[position] = True
+            group_row[root] = int(state_row[position])
+            kept_position[root] = position
     
-    reduced_df = data.loc[tweets_to_keep, :]
-    removed_df = data.loc[tweets_to_remove, :]
+    to_remove = in_group & ~is_first
+    if remove_zeroes == True:
+        to_remove |= zero
     
     '''
-    The last item is the dup_df, which is a pandas DataFrame of tweet IDs,
-    text, and group-identifiers. This can be used to assess sim_amt.
+    New group table: earlier groups that were joined together go under their
+    new keeper, and every new row goes under its group's.
     '''
+    groups = np.array(state.groups, dtype = np.int64)
+    if len(old_rows):
+        merged = {int(row) : group_row[int(roots[local])]
+                  for row, local in zip(kept_rows.tolist(), 
+                                        kept_local.tolist())
+                  if group_row[int(roots[local])] != row}
+        if merged:
+            old_keepers = np.array(list(merged.keys()), dtype = np.int64)
+            new_keepers = np.array(list(merged.values()), dtype = np.int64)
+            lookup = np.argsort(old_keepers)
+            old_keepers, new_keepers = old_keepers[lookup], new_keepers[lookup]
+            moved = np.isin(groups, old_keepers)
+            groups[moved] = new_keepers[np.searchsorted(old_keepers, 
+                                                        groups[moved])]
+    new_groups = np.array([group_row[int(new_roots[p])] for p in vec_pos.tolist()],
+                          dtype = np.int64)
     
-    dup_list = list()
-    for group in range(len(by_group)):
-        dup_df = pd.DataFrame(data.loc[by_group[group],
-                                     [tweet_id, tweet_text]])
-        dup_df['group'] = group
-        dup_list.append(dup_df)
-        
-    dup_df = pd.concat(dup_list)
+    ids = data[tweet_id].to_numpy()
+    if ids.dtype == object:
+        ids = ids.astype(str)
+    if len(vec_pos):
+        state.add(vectors,
+                  ids[vec_pos],
+                  created[vec_pos],
+                  np.concatenate([groups, new_groups]),
+                  settings)
+    
+    stage.done(n,
+               method = method,
+               earlier_tweets = m,
+               matched = int(in_group.sum()),
+               removed = int(to_remove.sum()))
+    
+    reduced_df = data.iloc[np.flatnonzero(~to_remove)]
+    removed_df = data.iloc[np.flatnonzero(to_remove)]
+    
+    grouped = np.flatnonzero(in_group)
+    grouped_roots = new_roots[grouped].tolist()
+    in_state = np.array([root in keeper for root in grouped_roots], 
+                        dtype = bool)
+    dup_df = pd.DataFrame(data.iloc[grouped][[tweet_id, tweet_text]])
+    
+    # label each group with the ID of its kept tweet, an earlier one or new;
+    # groups kept under an earlier tweet go first
+    label_ids = np.empty(len(grouped), dtype = object)
+    order_key = np.empty(len(grouped), dtype = np.int64)
+    if in_state.any():
+        kept_state = np.array([group_row[root] 
+                               for root, old in zip(grouped_roots, in_state)
+                               if old], dtype = np.int64)
+        label_ids[in_state] = state.column('tweet_ids', kept_state)
+        order_key[in_state] = kept_state
+    if (~in_state).any():
+        kept_new = np.array([kept_position[root] 
+                             for root, old in zip(grouped_roots, in_state)
+                             if not old], dtype = np.int64)
+        label_ids[~in_state] = ids[kept_new]
+        order_key[~in_state] = m + kept_new
+    dup_df['group'] = label_ids
+    dup_df = dup_df.iloc[np.argsort(order_key, kind = 'mergesort')]
     dup_df.set_index('group', inplace=True)
-        
-    return list([reduced_df, removed_df, dup_df])
     
+    return list([reduced_df, removed_df, dup_df])
+
+
 '''
 LDA Models
 '''
@@ -930,79 +3096,101 @@ def lemmatized_sentence_corpus(data,
     returns generator
     """
     for doc in data.get(parsed_col):
-        yield(u' '.join([token.lemma_ 
-                         for token in doc
-                         if not thing_to_remove(token)]))
+        yield(u' '.join(_doc_lemmas(doc)))
+
+
+def _phrase_sentence(lemmas):
+    """
+    A tweet's lemmas as phrase_model() trains on them: split on whitespace
+    (as they were when read back from phrase_model_unigram.txt), and without
+    a leading "." on the first one.
+    """
+    sentence = u' '.join(lemmas)
+    if sentence[:1] == '.':
+        sentence = sentence[1:]
+    return sentence.split()
 
 
 def phrase_model(data,
-                 parsed_col = 'parsed'):
+                 parsed_col = 'parsed',
+                 sentence_files = False):
 
     """
-    Creates unigram, bigram, and trigram models and sentences.
-    Created files:
-        phrase_model_unigram.txt : sentences based on lemmas
-        phrase_model_bigram.txt : sentences based on lemmas and bigrams
-        phrase_model_trigram.txt : sentences based on lemmas, bigrams, and trigrams
+    Creates bigram and trigram models. Sentences (lemmas) come straight from
+    the parsed tweets in memory: the bigram model is trained on them, and 
+    the trigram model on them as the bigram model joins them up, on the fly.
     
-    Created models:
-        bigram_model
-        trigram_model
+    Saved models (used later by trigram_transform()):
+        phrase_model_bigram_save.txt
+        phrase_model_trigram_save.txt
         
+    sentence_files: (bool)
+        Also write the sentences out, as earlier versions always did. 
+        Defaults to False.
+            phrase_model_unigram.txt : sentences based on lemmas
+            phrase_model_bigram_output.txt : sentences based on lemmas and 
+                bigrams
+            phrase_model_trigram_output.txt : sentences based on lemmas, 
+                bigrams, and trigrams
+    
     These models are used later to create the dictionary.    
 
+    returns dict of lists of tweets (index values) in the train, test, and
+    hold(out) sets
     """
     from gensim.models import Phrases
     from gensim.models.phrases import Phraser
-    from gensim.models.word2vec import LineSentence
     from pandas import concat
     
+    stage = _Stage('phrase_model', unit = 'sentences')
+    
     # shuffle data before starting --
         # Train/Test/Holdout data is taken from this order in a later step
     data_ids = set(data.index)
     train = data.sample(frac = .5)
     non_train_ids = data_ids.difference(set(train.index))
-    test = data.loc[non_train_ids, :].sample(frac = .5)
+    test = data.loc[list(non_train_ids), :].sample(frac = .5)
     holdout_ids = non_train_ids.difference(set(test.index))
-    holdout = data.loc[holdout_ids, :]
+    holdout = data.loc[list(holdout_ids), :]
     data_shuffled = concat([train, test, holdout])
     
     train_test_hold = {'train':list(train.index), 
                        'test': list(test.index),
                        'hold': list(holdout.index)}
     
+    unigram_sentences = [_phrase_sentence(_doc_lemmas(doc))
+                         for doc in data_shuffled[parsed_col].tolist()]
     
-    with open('phrase_model_unigram.txt', 'w', encoding = 'utf_8') as file:
-        for sentence in lemmatized_sentence_corpus(data = data_shuffled,
-                                                   parsed_col = parsed_col):
-            if sentence[0] == '.':
-                file.write(sentence[1:] + '\n')
-            else:
-                file.write(sentence + '\n')
-    
-    unigram_sentences = LineSentence('phrase_model_unigram.txt')
     bigram_model = Phrases(unigram_sentences)
     bigram_phraser = Phraser(bigram_model)
+    del bigram_model
     
 #    bigram_model.save('phrase_model_bigram_save.txt')
     bigram_phraser.save('phrase_model_bigram_save.txt')
     
-    with open('phrase_model_bigram_output.txt', 'w', encoding = 'utf_8') as file:
-        for sent in unigram_sentences:
-            bigram_sentence = u' '.join(bigram_phraser[sent])
-            file.write(bigram_sentence + '\n')
-            
-    bigram_sentences = LineSentence('phrase_model_bigram_output.txt')
-    trigram_model = Phrases(bigram_sentences)
+    trigram_model = Phrases(bigram_phraser[sent] 
+                            for sent in unigram_sentences)
     trigram_phraser = Phraser(trigram_model)
+    del trigram_model
     
 #    trigram_model.save('phrase_model_trigram_save.txt')
     trigram_phraser.save('phrase_model_trigram_save.txt')
     
-    with open('phrase_model_trigram_output.txt', 'w', encoding = 'utf_8') as file:
-        for sent in bigram_sentences:
-            trigram_sentence = u' '.join(trigram_phraser[sent])
-            file.write(trigram_sentence + '\n')
+    if sentence_files:
+        with open('phrase_model_unigram.txt', 'w', 
+                  encoding = 'utf_8') as unigram_file, \
+             open('phrase_model_bigram_output.txt', 'w', 
+                  encoding = 'utf_8') as bigram_file, \
+             open('phrase_model_trigram_output.txt', 'w', 
+                  encoding = 'utf_8') as trigram_file:
+            for sent in unigram_sentences:
+                bigram_sentence = bigram_phraser[sent]
+                unigram_file.write(u' '.join(sent) + '\n')
+                bigram_file.write(u' '.join(bigram_sentence) + '\n')
+                trigram_file.write(u' '.join(trigram_phraser[bigram_sentence])
+                                   + '\n')
+    
+    stage.done(len(unigram_sentences))
     
     return train_test_hold
 
@@ -1027,12 +3215,58 @@ def stop_word_update(stoplist = None, stop_add = [], stop_remove = []):
     return stoplist
     
     
+# phrasers and term filter of the trigram_transform() worker processes
+_trigram_worker = None
+
+
+def _init_trigram_worker(bigram_filepath, 
+                         trigram_filepath, 
+                         stoplist, 
+                         stop_remove):
+    """
+    Initializer of the trigram_transform() worker processes: loads the
+    frozen phrasers once per process and builds the term filter once.
+    """
+    from gensim.models.phrases import Phraser
+    
+    global _trigram_worker
+    
+    _trigram_worker = (Phraser.load(bigram_filepath),
+                       Phraser.load(trigram_filepath),
+                       frozenset(stoplist),
+                       frozenset(stop_remove))
+
+
+def _trigram_chunk(reviews):
+    """
+    Worker for trigram_transform(). Runs a chunk of documents (lists of 
+    lemmas) through the bigram and trigram phrasers and drops stoplist words
+    and one-letter words (unless they're in stop_remove).
+    
+    returns list of lists of str
+    """
+    bigram_phraser, trigram_phraser, stopset, short_keep = _trigram_worker
+    
+    trigram_list = list()
+    for unigram_review in reviews:
+        trigram_review = trigram_phraser[bigram_phraser[unigram_review]]
+        trigram_list.append([term for term in trigram_review
+                             if (term not in stopset  # no stoplist words
+                                 and (len(term) >= 2  # no short words
+                                      or term in short_keep))])
+                                          # unless they're in stop_remove
+    
+    return trigram_list
+
+
 def trigram_transform(data,
                       stoplist,
                       stop_remove = [],
                       parsed_col = 'parsed',
                       trigram_outfile = 'trigram_transformed.txt',
-                      trigram_col = 'trigram_review'):
+                      trigram_col = 'trigram_review',
+                      processes = 1,
+                      chunksize = 10000):
     """
     Takes parsed data in (dataframe.parsed) and lemmatizes the unigram tokens.
     These tokens are passed through the bigram and trigram models to combine
@@ -1043,6 +3277,12 @@ def trigram_transform(data,
         trigram_model: trigram model from phrase_model() output
         stoplist: list of stopwords (perhaps from stop_list_update() output)
         trigram_outfile: text document output destination
+        processes: number of worker processes the documents are shared out
+            across, chunksize documents at a time. None is one per CPU 
+            core. Defaults to 1 (everything is done in this process). On
+            Windows, call this from under an if __name__ == "__main__": 
+            guard.
+        chunksize: documents sent to a worker at a time. Defaults to 10000.
         
     *writes output file of lemmatized, stopword-removed, trigram_updated text:
         trigram_transformed.txt
@@ -1051,30 +3291,52 @@ def trigram_transform(data,
 
     returns nothing
     """
-    from gensim.models import Phrases
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+    
+    global _trigram_worker
+    
+    stage = _Stage('trigram_transform', unit = 'documents')
+    
+    # only lemmas go to the workers, not the parses themselves
+    reviews = [_doc_lemmas(parsed) for parsed in data[parsed_col].tolist()]
+    chunks = [reviews[start:start + chunksize]
+              for start in range(0, len(reviews), chunksize)]
+    
+    worker_args = ('phrase_model_bigram_save.txt',
+                   'phrase_model_trigram_save.txt',
+                   stoplist,
+                   stop_remove)
+    
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(chunks)))
+    
+    if processes == 1:
+        _init_trigram_worker(*worker_args)
+        results = map(_trigram_chunk, chunks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers = processes,
+                                       initializer = _init_trigram_worker,
+                                       initargs = worker_args)
+        results = executor.map(_trigram_chunk, chunks)
     
-    bigram_model = Phrases.load('phrase_model_bigram_save.txt')
-    trigram_model = Phrases.load('phrase_model_trigram_save.txt')
-    
-    with open(trigram_outfile, 'w', encoding = 'utf_8') as file:
-        item_list = list(data.index)
-        trigram_list = list()
-        for doc in item_list:
-            unigram_review = [token.lemma_ for token 
-                              in data.loc[doc, parsed_col]
-                              if not thing_to_remove(token)]
-            bigram_review = bigram_model[unigram_review]
-            trigram_review = trigram_model[bigram_review]
-            trigram_review = [term for term in trigram_review
-                              if (term not in stoplist  # no stoplist words
-                              and not (len(term) < 2  # no short words
-                                       and term not in set(stop_remove)
-                                           # unless they're in stop_remove
-                                   ))]
-            trigram_list.append(trigram_review)
-            trigram_review_str = u' '.join(trigram_review)
-            file.write(trigram_review_str + '\n')
-        data.loc[:, trigram_col] = trigram_list    
+    try:
+        with open(trigram_outfile, 'w', encoding = 'utf_8') as file:
+            trigram_list = list()
+            for chunk in results:
+                trigram_list.extend(chunk)
+                file.writelines([u' '.join(trigram_review) + '\n' 
+                                 for trigram_review in chunk])
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures = True)
+        _trigram_worker = None
+    
+    data[trigram_col] = trigram_list
+    
+    stage.done(len(trigram_list), processes = processes)
         
 
 def make_trigram(data, 
@@ -1161,17 +3423,261 @@ def trigram_bow_generator(trigram_transformed_filepath,
 
 
 
+def _line_shards(filepath, shards):
+    """
+    Cuts filepath into (up to) shards byte ranges (start, end) of about the
+    same size, each starting at the beginning of a line.
+    """
+    import os
+    
+    size = os.path.getsize(filepath)
+    bounds = [0]
+    with open(filepath, 'rb') as file:
+        for shard in range(1, shards):
+            position = max(size * shard // shards, bounds[-1] + 1)
+            if position >= size:
+                break
+            file.seek(position - 1)
+            file.readline() # to the start of the next line
+            if bounds[-1] < file.tell() < size:
+                bounds.append(file.tell())
+    bounds.append(size)
+    
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _shard_sentences(filepath, start = 0, end = None):
+    """
+    Sentences of the lines of filepath from byte start up to byte end (all
+    of them if end is None), exactly as LineSentence(filepath) gives them:
+    split on whitespace, with empty lines skipped.
+    """
+    from gensim import utils
+    from gensim.models.word2vec import MAX_WORDS_IN_BATCH
+    
+    with open(filepath, 'rb') as file:
+        file.seek(start)
+        position = start
+        for line in file:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            line = utils.to_unicode(line).split()
+            for i in range(0, len(line), MAX_WORDS_IN_BATCH):
+                yield line[i:i + MAX_WORDS_IN_BATCH]
+
+
+def _shard_dictionary(shard):
+    """
+    Worker for trigram_dict_bow(): Dictionary of one (filepath, start, end)
+    shard of the trigram file.
+    """
+    from gensim.corpora import Dictionary
+    
+    return Dictionary(_shard_sentences(*shard))
+
+
+def _shard_raw_bows(shard):
+    """
+    Worker for trigram_dict_bow(inline_dictionary = True): Dictionary of one
+    shard of the trigram file, plus the bag of words of each of its 
+    sentences (in that Dictionary's IDs).
+    """
+    from gensim.corpora import Dictionary
+    
+    dictionary = Dictionary()
+    bows = [dictionary.doc2bow(doc, allow_update = True)
+            for doc in _shard_sentences(*shard)]
+    
+    return dictionary, bows
+
+
+# the (filtered) dictionary of the trigram_dict_bow() worker processes
+_bow_dictionary = None
+
+
+def _init_bow_worker(dictionary_filepath):
+    """
+    Initializer of the trigram_dict_bow() doc2bow worker processes.
+    """
+    from gensim.corpora import Dictionary
+    
+    global _bow_dictionary
+    
+    _bow_dictionary = Dictionary.load(dictionary_filepath)
+
+
+def _shard_bows(shard):
+    """
+    Worker for trigram_dict_bow(): bag of words of each sentence of one 
+    shard of the trigram file.
+    """
+    return [_bow_dictionary.doc2bow(doc) for doc in _shard_sentences(*shard)]
+
+
+def _merge_dictionaries(dictionaries):
+    """
+    Merges the Dictionaries of consecutive shards into the first one. Tokens
+    get the same IDs as they would have if one Dictionary had been built
+    from all the shards in order, and document frequencies, collection 
+    frequencies, and counts are added up.
+    
+    returns the merged Dictionary and, for each shard, a dict mapping its IDs
+    to the merged ones (None for the first)
+    """
+    merged = dictionaries[0]
+    id_maps = [None]
+    for other in dictionaries[1:]:
+        old2new = merged.merge_with(other).old2new
+        for other_id, count in other.cfs.items():
+            new_id = old2new[other_id]
+            merged.cfs[new_id] = merged.cfs.get(new_id, 0) + count
+        id_maps.append(old2new)
+    
+    return merged, id_maps
+
+
+class _MmSplitWriter(object):
+    """
+    Writes one Matrix Market corpus a document at a time, exactly as 
+    MmCorpus.serialize() would (including its .index file), so that 
+    trigram_dict_bow() can write the train, test, and hold corpora side by
+    side in one pass.
+    """
+    
+    def __init__(self, filepath):
+        from gensim.matutils import MmWriter
+        
+        self.filepath = filepath
+        self.writer = MmWriter(filepath)
+        # room for the real headers, which are only known at the end
+        self.writer.write_headers(-1, -1, -1)
+        self.offsets = list()
+        self.num_docs = 0
+        self.num_terms = 0
+        self.num_nnz = 0
+    
+    def add(self, bow):
+        position = self.writer.fout.tell()
+        if self.offsets and self.offsets[-1] == position:
+            self.offsets[-1] = -1 # previous document was empty
+        self.offsets.append(position)
+        
+        max_id, length = self.writer.write_vector(self.num_docs, bow)
+        self.num_docs += 1
+        self.num_terms = max(self.num_terms, 1 + max_id)
+        self.num_nnz += length
+    
+    def close(self):
+        from gensim import utils
+        
+        self.writer.fake_headers(self.num_docs, self.num_terms, self.num_nnz)
+        self.writer.close()
+        utils.pickle(self.offsets, 
+                     utils.smart_extension(self.filepath, '.index'))
+
+
+class _CsrSplitWriter(object):
+    """
+    Counterpart of _MmSplitWriter() for corpus_format = 'csr': collects a
+    corpus a document at a time and saves it as a folder holding a CSR
+    matrix (one row per document) as indptr.npy, indices.npy, data.npy, and
+    shape.npy, which _load_bow_corpus() memory-maps back in.
+    """
+    
+    def __init__(self, filepath):
+        from array import array
+        
+        self.filepath = filepath
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+        self.data = array('f')
+        self.num_docs = 0
+        self.num_terms = 0
+    
+    def add(self, bow):
+        for term, count in bow:
+            self.indices.append(term)
+            self.data.append(count)
+        self.indptr.append(len(self.indices))
+        self.num_docs += 1
+        if bow:
+            self.num_terms = max(self.num_terms, 1 + bow[-1][0])
+    
+    def close(self):
+        import os
+        import numpy as np
+        
+        os.makedirs(self.filepath, exist_ok = True)
+        arrays = {'indptr' : np.frombuffer(self.indptr, dtype = np.int64),
+                  'indices' : np.frombuffer(self.indices, dtype = np.int32),
+                  'data' : np.frombuffer(self.data, dtype = np.float32),
+                  'shape' : np.array([self.num_docs, self.num_terms], 
+                                     dtype = np.int64)}
+        for name, values in arrays.items():
+            np.save(os.path.join(self.filepath, name + '.npy'), values)
+
+
+def _load_bow_corpus(filepath):
+    """
+    Opens a bag-of-words corpus written by trigram_dict_bow(): an MmCorpus,
+    or, for a corpus_format = 'csr' folder, its memory-mapped CSR matrix
+    streamed to gensim through Sparse2Corpus (no text to parse on each 
+    pass over it).
+    """
+    import os
+    
+    if not os.path.isdir(filepath):
+        from gensim.corpora import MmCorpus
+        return MmCorpus(filepath)
+    
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from gensim.matutils import Sparse2Corpus
+    
+    arrays = {name : np.load(os.path.join(filepath, name + '.npy'),
+                             mmap_mode = 'r')
+              for name in ('indptr', 'indices', 'data')}
+    shape = tuple(np.load(os.path.join(filepath, 'shape.npy')).tolist())
+    matrix = csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                        shape = shape)
+    
+    return Sparse2Corpus(matrix, documents_columns = False)
+
+
+def _bow_corpus_filepath(split, trigram_bow_filepath, corpus_format = 'mm'):
+    """
+    Where trigram_dict_bow() writes the bag-of-words corpus of split ('train',
+    'test', or 'hold'), e.g., 'train_trigram_bow_corpus.mm', or with 
+    corpus_format = 'csr', the folder 'train_trigram_bow_corpus.csr'.
+    """
+    import os
+    
+    if corpus_format == 'csr':
+        trigram_bow_filepath = os.path.splitext(trigram_bow_filepath)[0] + '.csr'
+    
+    return split + '_' + trigram_bow_filepath
+
+
 def trigram_dict_bow(extremes,
                      train_test_hold,
                      keep_tokens = [],
                      trigram_transformed_filepath = 'trigram_transformed.txt',
                      trigram_dictionary_filepath = 'trigram_dict.dict',
-                     trigram_bow_filepath = 'trigram_bow_corpus.mm'):
+                     trigram_bow_filepath = 'trigram_bow_corpus.mm',
+                     inline_dictionary = False,
+                     processes = 1,
+                     corpus_format = 'mm'):
     """
     Prepares and saves dictionary and bag-of-words corpus from 
     trigrammed/normalized text. This step is separated from the LDA creation
     for looping purposes.
     
+    The text is read once to build the dictionary and once more to write the
+    train, test, and hold corpora, each document going straight to the one
+    it belongs in (the first len(train_test_hold['train']) lines to train,
+    the next len(train_test_hold['test']) to test, the rest to hold).
+    
     extremes: (list of numbers) 
         low/high values for dictionary extremes
             [0]: (int) 
@@ -1192,38 +3698,214 @@ def trigram_dict_bow(extremes,
         
     trigram_bow_filepath: (string)
         where the bag of words corpus should be saved
+        
+    inline_dictionary: (bool)
+        Build the dictionary in the same (single) pass as the corpora: every
+        document's bag of words is held in memory until the dictionary has 
+        been filtered, then mapped onto the filtered dictionary's IDs. Gives
+        the same files; trades memory for a pass over the text. Defaults to
+        False.
+        
+    processes: (int)
+        Number of worker processes. The text is cut into shards (by lines);
+        each worker counts the tokens of a shard into its own dictionary, 
+        the shard dictionaries are merged before filtering, and then each
+        worker works out the bags of words of a shard, which are written
+        out in order. Gives the same files. None uses one per CPU core. On 
+        Windows, call this from under an if __name__ == "__main__": guard.
+        Defaults to 1.
+        
+    corpus_format: (str)
+        'mm' saves each corpus as a Matrix Market file (e.g.,
+        train_trigram_bow_corpus.mm). 'csr' saves it instead as a folder
+        (e.g., train_trigram_bow_corpus.csr) of binary CSR matrix arrays, 
+        which lda_k_finder() memory-maps and hands to gensim without any
+        text parsing -- much faster to go through pass after pass. 
+        Defaults to 'mm'.
     
     returns list of strings:
         trigram_dictionary_filepath,
         trigram_bow_filepath
         
     """
-    from gensim.models.word2vec import LineSentence
-    from gensim.corpora import Dictionary, MmCorpus
+    import os
+    from concurrent.futures import ProcessPoolExecutor
     
-    trigram_reviews = LineSentence(trigram_transformed_filepath)
-        
-    trigram_dictionary = Dictionary(trigram_reviews)
-    trigram_dictionary.filter_extremes(no_below = extremes[0], 
-                                       no_above = extremes[1],
-                                       keep_tokens = keep_tokens)
-    trigram_dictionary.compactify()
-    trigram_dictionary.save(trigram_dictionary_filepath)
+    global _bow_dictionary
+    
+    stage = _Stage('trigram_dict_bow', unit = 'documents')
     
     train_test_hold_lens = {k:len(v) for k, v in train_test_hold.items()}
     
-    trigram_bow_filepaths = list()
-    for k, v in train_test_hold_lens.items():
-        MmCorpus.serialize(k + '_' + trigram_bow_filepath,
-                           trigram_bow_generator(trigram_transformed_filepath,
-                                                 trigram_dictionary,
-                                                 train_test_hold_lens,
-                                                 k))
-        trigram_bow_filepaths.append(k + '_' + trigram_bow_filepath)
+    # split each line goes to, by line number
+    train_end = train_test_hold_lens['train']
+    test_end = train_end + train_test_hold_lens['test']
+    
+    def split_lines(docs):
+        for counter, doc in enumerate(docs):
+            if counter < train_end:
+                yield 'train', doc
+            elif counter < test_end:
+                yield 'test', doc
+            else:
+                yield 'hold', doc
+    
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1:
+        shards = [(trigram_transformed_filepath, 0, None)]
+        executor = None
+        pool_map = map
+    else:
+        shards = [(trigram_transformed_filepath, start, end)
+                  for start, end in _line_shards(trigram_transformed_filepath,
+                                                 processes * 4)]
+        executor = ProcessPoolExecutor(max_workers = processes)
+        pool_map = executor.map
+    
+    writers = dict()
+    try:
+        if inline_dictionary:
+            shard_dictionaries, shard_bows = zip(*pool_map(_shard_raw_bows, 
+                                                           shards))
+        else:
+            shard_dictionaries = list(pool_map(_shard_dictionary, shards))
+        trigram_dictionary, id_maps = _merge_dictionaries(
+                                          list(shard_dictionaries))
+        del shard_dictionaries
+        # IDs before filtering, to map the shards' bags of words through
+        merged_ids = dict(trigram_dictionary.token2id)
+        
+        trigram_dictionary.filter_extremes(no_below = extremes[0], 
+                                           no_above = extremes[1],
+                                           keep_tokens = keep_tokens)
+        trigram_dictionary.compactify()
+        trigram_dictionary.save(trigram_dictionary_filepath)
+        
+        writer_class = {'mm' : _MmSplitWriter, 
+                        'csr' : _CsrSplitWriter}[corpus_format]
+        writers = {k : writer_class(_bow_corpus_filepath(k, 
+                                                         trigram_bow_filepath,
+                                                         corpus_format))
+                   for k in train_test_hold_lens}
+        
+        if inline_dictionary:
+            # merged ID -> filtered ID (-1 if it was filtered out)
+            token2id = trigram_dictionary.token2id
+            filtered = [-1] * len(merged_ids)
+            for token, merged_id in merged_ids.items():
+                filtered[merged_id] = token2id.get(token, -1)
+            
+            def inline_bows():
+                for bows, id_map in zip(shard_bows, id_maps):
+                    if id_map is None:
+                        new_id = filtered
+                    else:
+                        new_id = {i : filtered[j] for i, j in id_map.items()}
+                    for bow in bows:
+                        yield sorted((new_id[i], count) 
+                                     for i, count in bow 
+                                     if new_id[i] != -1)
+            bows = inline_bows()
+        elif executor is None:
+            _init_bow_worker(trigram_dictionary_filepath)
+            bows = (bow for shard in map(_shard_bows, shards) 
+                    for bow in shard)
+        else:
+            executor.shutdown()
+            executor = ProcessPoolExecutor(
+                           max_workers = processes,
+                           initializer = _init_bow_worker,
+                           initargs = (trigram_dictionary_filepath,))
+            bows = (bow for shard in executor.map(_shard_bows, shards) 
+                    for bow in shard)
+        
+        for k, bow in split_lines(bows):
+            writers[k].add(bow)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures = True)
+        _bow_dictionary = None
+        for writer in writers.values():
+            writer.close()
+    
+    trigram_bow_filepaths = [writers[k].filepath for k in train_test_hold_lens]
+    
+    stage.done(sum(writer.num_docs for writer in writers.values()),
+               dictionary_size = len(trigram_dictionary),
+               processes = processes)
     
     return list([trigram_dictionary_filepath, trigram_bow_filepaths])
 
 
+def _lda_inputs(trigram_dictionary_filepath, 
+                trigram_bow_filepath_stem, 
+                corpus_format):
+    """
+    Loads the dictionary and the corpuses (dict of 'train', 'test', and 
+    'hold') saved by trigram_dict_bow().
+    """
+    from gensim.corpora import Dictionary
+    
+    dictionary = Dictionary.load(trigram_dictionary_filepath)
+    
+    corpuses = {split : _load_bow_corpus(
+                            _bow_corpus_filepath(split, 
+                                                 trigram_bow_filepath_stem,
+                                                 corpus_format))
+                for split in ('train', 'test', 'hold')}
+    
+    return dictionary, corpuses
+
+
+def _lda_train(k, dictionary, training_corpus, passes, 
+               chunksize, iterations, workers):
+    """
+    The LDA model of lda_k_finder(): k topics, passes passes over 
+    training_corpus.
+    """
+    from gensim.models import ldamulticore
+    
+    return ldamulticore.LdaMulticore(corpus = training_corpus,
+                                     num_topics = k,
+                                     id2word = dictionary,
+                                     passes = passes,
+                                     chunksize = chunksize,
+                                     iterations = iterations,
+                                     alpha = 'asymmetric',
+                                     workers = workers,
+                                     eval_every = None)
+
+
+def _lda_model_info(model, filename, dictionary, corpuses, training_texts):
+    """
+    Scores model on the test and holdout corpuses (bound) and for coherence
+    (u_mass and c_v), and saves it as filename.
+    
+    returns dict (model_info of lda_k_finder())
+    """
+    from gensim.models import coherencemodel
+    
+    pl_test = model.bound(corpuses['test'])
+    pl_holdout = model.bound(corpuses['hold'])
+    ch_umass = coherencemodel.CoherenceModel(model = model,
+                                             corpus = corpuses['train'],
+                                             coherence = 'u_mass').get_coherence()
+    ch_cv = coherencemodel.CoherenceModel(model = model,
+                                          corpus = corpuses['train'],
+                                          dictionary = dictionary,
+                                          coherence = 'c_v',
+                                          texts = training_texts).get_coherence()
+    
+    model.save(filename)
+    
+    return {"model_stem" : filename,
+            "perplexity_test" : pl_test,
+            "perplexity_holdout" : pl_holdout,
+            "coherence_umass" : ch_umass,
+            "coherence_cv" : ch_cv}
+
+
 ####################
 
 def lda_k_finder(k,
@@ -1236,54 +3918,36 @@ def lda_k_finder(k,
                  iterations = 50,
                  chunksize = 1500,
                  passes = 20,
-                 workers = None):
+                 workers = None,
+                 corpus_format = 'mm'):
     """
+    corpus_format: (str)
+        How trigram_dict_bow() saved the corpuses: 'mm' for Matrix Market 
+        files, 'csr' for memory-mapped CSR folders (much faster to pass over,
+        every pass of the model and every bound() reads it again). Defaults
+        to 'mm'.
     """
-    from gensim.corpora import MmCorpus, Dictionary  
-    from gensim.models import ldamulticore, coherencemodel
-
-    dictionary = Dictionary.load('trigram_dict.dict')
-
-    # corpuses
-    holdout_corpus = MmCorpus('hold_trigram_bow_corpus.mm')
-    test_corpus = MmCorpus('test_trigram_bow_corpus.mm')
-    training_corpus = MmCorpus('train_trigram_bow_corpus.mm')
+    stage = _Stage('lda_k_finder', unit = 'documents', k = k,
+                   corpus_format = corpus_format)
+    
+    dictionary, corpuses = _lda_inputs(trigram_dictionary_filepath,
+                                       trigram_bow_filepath_stem,
+                                       corpus_format)
     
     # texts
     training_texts = data.loc[train_test_hold['train'], trigram_colname].tolist()
 
     # make a model
-    model = ldamulticore.LdaMulticore(corpus = training_corpus,
-                                      num_topics = k,
-                                      id2word = dictionary,
-                                      passes = passes,
-                                      chunksize = chunksize,
-                                      iterations = iterations,
-                                      alpha = 'asymmetric',
-                                      workers = workers,
-                                      eval_every = None)
-
-    # test a model
-    pl_test = model.bound(test_corpus)
-    pl_holdout = model.bound(holdout_corpus)
-    ch_umass = coherencemodel.CoherenceModel(model = model,
-                                             corpus = training_corpus,
-                                             coherence = 'u_mass').get_coherence()
-    ch_cv = coherencemodel.CoherenceModel(model = model,
-                                          corpus = training_corpus,
-                                          dictionary = dictionary,
-                                          coherence = 'c_v',
-                                          texts = training_texts).get_coherence()
-    
-    # save a model
+    model = _lda_train(k, dictionary, corpuses['train'], passes, 
+                       chunksize, iterations, workers)
+
+    # test and save a model
     filename = "k_" + str(k) + "_" + lda_model_filepath_stem
-    model.save(filename)
+    model_info = _lda_model_info(model, filename, dictionary, corpuses, 
+                                 training_texts)
     
-    model_info = {"model_stem" : filename,
-                  "perplexity_test" : pl_test,
-                  "perplexity_holdout" : pl_holdout,
-                  "coherence_umass" : ch_umass,
-                  "coherence_cv" : ch_cv}
+    # documents trained on, every pass
+    stage.done(len(corpuses['train']) * passes, passes = passes)
     
     # return a model
     return model_info
@@ -1292,6 +3956,367 @@ def lda_k_finder(k,
 
 
 
+# training texts of the lda_k_sweep() worker processes
+_sweep_worker = None
+
+
+def _init_sweep_worker(data, train_test_hold, memory_limit_mb):
+    """
+    Initializer of the lda_k_sweep() worker processes: keeps the training
+    texts (sent once per process, not once per k) and caps the memory this
+    process, and the LdaMulticore workers it starts, may allocate.
+    """
+    global _sweep_worker
+    
+    # stages are reported back to (and by) the process running the sweep
+    del _stage_records[:]
+    del _stage_callbacks[:]
+    
+    if memory_limit_mb is not None:
+        try:
+            import resource
+        except ImportError:
+            resource = None
+        if resource is not None:
+            # the libraries reserve a lot (e.g., BLAS buffers) just loading,
+            # so load them first and only limit what comes on top of that
+            import scipy.sparse  # noqa: F401 (loaded for its side effect)
+            import gensim.models  # noqa: F401 (loaded for its side effect)
+            
+            base = 0
+            try:
+                with open('/proc/self/status') as file:
+                    for line in file:
+                        if line.startswith('VmData:'):
+                            base = int(line.split()[1]) << 10
+            except OSError:
+                pass
+            
+            # memory-mapped files (the 'csr' corpuses) don't count to this
+            soft, hard = resource.getrlimit(resource.RLIMIT_DATA)
+            limit = base + (int(memory_limit_mb) << 20)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+    
+    _sweep_worker = (data, train_test_hold)
+
+
+def _sweep_task(task):
+    """
+    Worker for lda_k_sweep(). Runs function(*args) for task = (function, 
+    args), e.g., _sweep_finder() for one k.
+    
+    returns (result dict, wall seconds, list of the stage records it made)
+    """
+    import time
+    
+    function, args = task
+    
+    start = time.time()
+    try:
+        result = function(*args)
+    except (MemoryError, RuntimeError) as error:
+        # without memory for its stack, a thread doesn't start either
+        if (isinstance(error, RuntimeError) 
+            and "can't start new thread" not in str(error)):
+            raise
+        result = {'model_stem' : None,
+                  'error' : repr(error)}
+    seconds = time.time() - start
+    
+    records = list(_stage_records)
+    del _stage_records[:]
+    
+    return result, seconds, records
+
+
+def _sweep_results(executor, tasks):
+    """
+    Hands tasks (dict of key : (function, args)) to the lda_k_sweep() 
+    worker processes and yields (key, result dict, wall seconds) as each 
+    finishes. Stage records made in the workers are added to this 
+    process's and sent to its stage callbacks.
+    """
+    from concurrent.futures import as_completed
+    
+    futures = {executor.submit(_sweep_task, task) : key 
+               for key, task in tasks.items()}
+    for future in as_completed(futures):
+        result, seconds, records = future.result()
+        
+        for record in records:
+            _stage_records.append(record)
+            for callback in list(_stage_callbacks):
+                callback(record)
+        
+        yield futures[future], result, seconds
+
+
+def _sweep_finder(k, finder_args):
+    """
+    Trains and scores k with lda_k_finder() (lda_k_sweep(search = 'full')).
+    """
+    data, train_test_hold = _sweep_worker
+    
+    return lda_k_finder(k, data, train_test_hold, **finder_args)
+
+
+def _sweep_rung(k, passes, start, finder_args):
+    """
+    One rung of lda_k_sweep(search = 'halving'): trains k for passes more 
+    passes -- a new model if start, otherwise the one the last rung saved --
+    saves it, and scores it on the test corpus.
+    
+    returns dict: perplexity_test (bound on the test corpus)
+    """
+    from gensim.models import ldamulticore
+    
+    dictionary, corpuses = _lda_inputs(
+                                finder_args['trigram_dictionary_filepath'],
+                                finder_args['trigram_bow_filepath_stem'],
+                                finder_args['corpus_format'])
+    filename = "k_" + str(k) + "_" + finder_args['lda_model_filepath_stem']
+    
+    if start:
+        model = _lda_train(k, dictionary, corpuses['train'], passes,
+                           finder_args['chunksize'], 
+                           finder_args['iterations'], 
+                           finder_args['workers'])
+    else:
+        model = ldamulticore.LdaMulticore.load(filename)
+        # LdaMulticore.update() goes over the corpus self.passes times
+        model.passes = passes
+        model.update(corpuses['train'])
+    
+    model.save(filename)
+    
+    return {'perplexity_test' : model.bound(corpuses['test'])}
+
+
+def _sweep_score(k, finder_args):
+    """
+    Scores the model that lda_k_sweep(search = 'halving') finished training
+    for k just as lda_k_finder() does.
+    """
+    from gensim.models import ldamulticore
+    
+    data, train_test_hold = _sweep_worker
+    
+    dictionary, corpuses = _lda_inputs(
+                                finder_args['trigram_dictionary_filepath'],
+                                finder_args['trigram_bow_filepath_stem'],
+                                finder_args['corpus_format'])
+    filename = "k_" + str(k) + "_" + finder_args['lda_model_filepath_stem']
+    training_texts = data.loc[train_test_hold['train'], 
+                              finder_args['trigram_colname']].tolist()
+    
+    return _lda_model_info(ldamulticore.LdaMulticore.load(filename), 
+                           filename, dictionary, corpuses, training_texts)
+
+
+def lda_k_sweep(k_list,
+                data,
+                train_test_hold,
+                cores = None,
+                workers_per_model = None,
+                memory_limit_mb = None,
+                trigram_colname = 'trigram_review',
+                trigram_dictionary_filepath = 'trigram_dict.dict',
+                trigram_bow_filepath_stem = 'trigram_bow_corpus.mm',
+                lda_model_filepath_stem = 'lda_model',
+                iterations = 50,
+                chunksize = 1500,
+                passes = 20,
+                corpus_format = 'mm',
+                search = 'full',
+                rung_passes = 2,
+                keep = 0.5,
+                tol = 0.001):
+    """
+    Runs lda_k_finder() for every k in k_list, several models at once, and
+    collects what it returns. Models are trained in worker processes that 
+    each read the same saved dictionary and corpuses, so with 
+    corpus_format = 'csr' the (memory-mapped) corpuses are held in memory 
+    only once however many models are training. The training texts (for
+    c_v coherence) are sent once to each worker process. On Windows, call
+    this from under an if __name__ == "__main__": guard.
+    
+    k_list: (list of ints)
+        Numbers of topics to try.
+            e.g., k_list = [10, 20, 50, 100]
+            
+    cores: (int)
+        Total number of CPU cores the sweep may use. Defaults to None (all of
+        them).
+        
+    workers_per_model: (int)
+        LdaMulticore workers of each model. Every model also needs a core for
+        itself, so cores // (workers_per_model + 1) models train at once. 
+        Defaults to None: the cores are shared out so that every k can train
+        at the same time (at least 1 worker each), and if there aren't 
+        enough cores for that, as many models as possible train at once, 
+        1 worker each. Large k go first, being the slowest.
+        
+    memory_limit_mb: (int)
+        Most memory (MB) that a model's process may allocate beyond what 
+        loading gensim takes. Its LdaMulticore workers start with what it
+        has at the time and can't go past the same total. A model that runs
+        over it stops with a MemoryError (or a thread that can't start), 
+        which is recorded in its row (error) rather than ending the sweep.
+        Memory-mapped corpuses don't count to it. Ignored where the OS can't
+        do it (Windows). Defaults to None (no limit).
+        
+    corpus_format: (str)
+        'mm' or 'csr', as given to trigram_dict_bow(). Defaults to 'mm'.
+        
+    search: (str)
+        'full' trains every k for all passes. 'halving' (successive halving)
+        trains every k rung_passes passes at a time; after each of these 
+        rungs the models are ranked by bound() on the test corpus (their
+        perplexity_test) and only the best keep share of them go on to the
+        next rung. A model also stops once a rung improves its bound by 
+        less than tol (relative), having converged. Those left are trained
+        up to passes (or until they converge) and then scored in full. Much
+        less training overall than 'full', when some k are clearly worse 
+        early on. Defaults to 'full'.
+        
+    rung_passes: (int)
+        Passes per rung of search = 'halving'. Defaults to 2.
+        
+    keep: (float)
+        Share of the models that go on after each rung of search = 
+        'halving' (at least one always does). Defaults to 0.5.
+        
+    tol: (float)
+        Relative improvement of a model's test bound over a rung of search =
+        'halving' under which it counts as converged. Defaults to 0.001.
+        
+    The rest go to lda_k_finder() as they are.
+    
+    returns pandas DataFrame, one row per k (in order of k): k, model_stem, 
+        perplexity_test, perplexity_holdout, coherence_umass, coherence_cv,
+        workers, and seconds (the training and scoring wall time of that k).
+        With search = 'halving' also passes (how many it was trained for),
+        converged, and dropped (True if it was let go after a rung, which
+        leaves only its perplexity_test).
+    """
+    import math
+    import os
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    
+    if search not in ('full', 'halving'):
+        raise ValueError("search must be 'full' or 'halving'.")
+    
+    k_list = sorted(set(k_list), reverse = True)
+    
+    stage = _Stage('lda_k_sweep', unit = 'models', search = search)
+    
+    if cores is None:
+        cores = os.cpu_count() or 1
+    if workers_per_model is None:
+        workers_per_model = max(1, cores // len(k_list) - 1)
+    concurrent = max(1, min(len(k_list), cores // (workers_per_model + 1)))
+    
+    finder_args = {'trigram_colname' : trigram_colname,
+                   'trigram_dictionary_filepath' : trigram_dictionary_filepath,
+                   'trigram_bow_filepath_stem' : trigram_bow_filepath_stem,
+                   'lda_model_filepath_stem' : lda_model_filepath_stem,
+                   'iterations' : iterations,
+                   'chunksize' : chunksize,
+                   'passes' : passes,
+                   'workers' : workers_per_model,
+                   'corpus_format' : corpus_format}
+    
+    # the workers only need the training texts
+    train_data = data.loc[train_test_hold['train'], [trigram_colname]]
+    worker_args = (train_data, 
+                   {'train' : train_test_hold['train']}, 
+                   memory_limit_mb)
+    
+    rows = {k : {'k' : k,
+                 'model_stem' : None,
+                 'perplexity_test' : None,
+                 'perplexity_holdout' : None,
+                 'coherence_umass' : None,
+                 'coherence_cv' : None,
+                 'workers' : workers_per_model, 
+                 'seconds' : 0.0} for k in k_list}
+    
+    # always in worker processes, so memory_limit_mb never applies to this one
+    executor = ProcessPoolExecutor(max_workers = concurrent,
+                                   initializer = _init_sweep_worker,
+                                   initargs = worker_args)
+    try:
+        if search == 'full':
+            tasks = {k : (_sweep_finder, (k, finder_args)) for k in k_list}
+            for k, model_info, seconds in _sweep_results(executor, tasks):
+                rows[k].update(model_info)
+                rows[k]['seconds'] = seconds
+        
+        else:
+            for row in rows.values():
+                row.update({'passes' : 0, 
+                            'converged' : False, 
+                            'dropped' : False})
+            alive = list(k_list)
+            
+            while True:
+                training = [k for k in alive 
+                            if not rows[k]['converged'] 
+                            and rows[k]['passes'] < passes]
+                if not training:
+                    break
+                
+                more_passes = {k : min(rung_passes, passes - rows[k]['passes'])
+                               for k in training}
+                tasks = {k : (_sweep_rung, (k, 
+                                            more_passes[k],
+                                            rows[k]['passes'] == 0,
+                                            finder_args)) 
+                         for k in training}
+                for k, result, seconds in _sweep_results(executor, tasks):
+                    row = rows[k]
+                    row['seconds'] += seconds
+                    if 'error' in result:
+                        row.update(result)
+                        alive.remove(k)
+                        continue
+                    
+                    last_bound = row['perplexity_test']
+                    row['passes'] += more_passes[k]
+                    row['perplexity_test'] = result['perplexity_test']
+                    if (last_bound is not None 
+                        and (result['perplexity_test'] - last_bound 
+                             < tol * abs(last_bound))):
+                        row['converged'] = True
+                
+                # the higher the bound, the better
+                alive.sort(key = lambda k: rows[k]['perplexity_test'], 
+                           reverse = True)
+                kept = max(1, math.ceil(len(alive) * keep))
+                for k in alive[kept:]:
+                    rows[k]['dropped'] = True
+                del alive[kept:]
+            
+            tasks = {k : (_sweep_score, (k, finder_args)) for k in alive}
+            for k, model_info, seconds in _sweep_results(executor, tasks):
+                rows[k].update(model_info)
+                rows[k]['seconds'] += seconds
+    finally:
+        executor.shutdown(cancel_futures = True)
+    
+    model_df = pd.DataFrame([rows[k] for k in sorted(rows)])
+    
+    stage.done(len(rows), 
+               cores = cores, 
+               concurrent = concurrent, 
+               workers_per_model = workers_per_model)
+    
+    return model_df
+
+
 ####################
 """
 # So this works if you want to visualize it, but when you try to do this from
@@ -1515,19 +4540,24 @@ def ldavis_to_html(k_list,
                    lda_model_filepath_stem = 'lda_model',
                    html_out_filepath_stem = 'ldavis.html',
                    trigram_dictionary_filepath = 'trigram_dict.dict',
-                   trigram_bow_filepath = 'trigram_bow_corpus.mm'):
+                   trigram_bow_filepath = 'trigram_bow_corpus.mm',
+                   corpus_format = 'mm'):
    
     """
     Create HTML output for each in a list of LDA models
+        corpus_format: 'mm' or 'csr', as given to trigram_dict_bow(). 
+            Defaults to 'mm'.
     """    
     from gensim.corpora import Dictionary, MmCorpus
     from gensim.models import LdaMulticore
     from itertools import chain
 
     trigram_dictionary = Dictionary.load(trigram_dictionary_filepath)      
-    trigram_bow_corpus = chain(chain(MmCorpus('train_' + trigram_bow_filepath),
-                               MmCorpus('test_' + trigram_bow_filepath)),
-                               MmCorpus('hold_' + trigram_bow_filepath))
+    trigram_bow_corpus = chain.from_iterable(
+            _load_bow_corpus(_bow_corpus_filepath(split, 
+                                                  trigram_bow_filepath,
+                                                  corpus_format))
+            for split in ('train', 'test', 'hold'))
     MmCorpus.serialize(trigram_bow_filepath, trigram_bow_corpus)
     trigram_bow_corpus = MmCorpus(trigram_bow_filepath)
     
@@ -1559,20 +4589,20 @@ def top_tweets(data,
     for topic in range(0, int(k)):
         all_scores.append(list())
     
-    data.apply(lambda x: topic_to_dict(topic_dist = x.loc[colname],
-                                       all_scores = all_scores,
-                                       tweet_id = x.loc[tweet_id]),
-               axis = 1)
+    # scores are kept by row position, then turned into tweet IDs at the end
+    ids = data[tweet_id].tolist()
+    texts = data[tweet_text].tolist()
+    for position, topic_dist in enumerate(data[colname].tolist()):
+        topic_to_dict(topic_dist = topic_dist,
+                      all_scores = all_scores,
+                      tweet_id = position)
 
     final_scores = list()
-    for topic in all_scores:
-        topic = sorted(topic, key = lambda x: -x[1])
-        final_scores.append(topic[0:top_n])
-    
     top_tweets = list()
-    for topic in final_scores:
-        
-        top_tweets.append([[data.loc[i[0], 'tweet_id'], data.loc[i[0], 'tweet_text']] for i in topic])
+    for topic in all_scores:
+        topic = sorted(topic, key = lambda x: -x[1])[0:top_n]
+        final_scores.append([[ids[i[0]], i[1]] for i in topic])
+        top_tweets.append([[ids[i[0]], texts[i[0]]] for i in topic])
     
     return list([final_scores, top_tweets])
         
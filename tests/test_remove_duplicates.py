@@ -0,0 +1,136 @@
+"""
+Checks for effort.remove_duplicates() and the pair finders behind it. No 
+spaCy needed: the tweets come already parsed, as CompactDocs with made-up 
+vectors.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import effort
+
+
+def test_unknown_method_raises():
+    data = pd.DataFrame({'tweet_id' : [1], 'tweet_text' : ["a"]})
+    with pytest.raises(ValueError, match = "method must be"):
+        effort.remove_duplicates(data, method = "simhash")
+
+
+def _tweets(ids, texts, vectors):
+    n = len(ids)
+    vectors = np.asarray(vectors, dtype = np.float32)
+    parse = effort.CompactParse(np.zeros(n, dtype = np.uint64),
+                                np.zeros(n, dtype = np.uint8),
+                                np.arange(n + 1, dtype = np.int64),
+                                vectors,
+                                (vectors != 0).any(axis = 1).astype(np.int32),
+                                dict())
+    return pd.DataFrame({'tweet_id' : ids,
+                         'tweet_text' : texts,
+                         'tweet_created_at' : pd.to_datetime(
+                                 [1.5e9 + int(i) for i in ids], unit = 's'),
+                         'parsed' : [effort.CompactDoc(parse, i) for i in range(n)]})
+
+
+def _near_copies(bases = 6, copies = 4, dims = 50, seed = 0):
+    # copies of a tweet differ in their last word (a Jaccard similarity of 
+    # 9 / 11 on 3-word shingles) and by a little noise in their vectors
+    rng = np.random.default_rng(seed)
+    
+    def word():
+        # no digits, which the exact-duplicate pass ignores
+        return "".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz"), 8))
+    
+    texts = list()
+    vectors = list()
+    for b in range(bases):
+        words = [word() for k in range(11)]
+        vector = rng.normal(size = dims)
+        for c in range(copies):
+            texts.append(" ".join(words + [word()]))
+            vectors.append(vector + rng.normal(scale = 1e-3, size = dims))
+    ids = [str(100 + i) for i in range(len(texts))]
+    return ids, texts, np.array(vectors)
+
+
+def _groups(dup):
+    return sorted(sorted(ids) for _, ids in dup.groupby(level = 0)['tweet_id'])
+
+
+def test_union_find():
+    roots = effort._union_find(7, [(np.array([0, 5]), np.array([1, 6])),
+                                   (np.array([1]), np.array([3]))])
+    assert roots[0] == roots[1] == roots[3]
+    assert roots[5] == roots[6]
+    assert len(set(roots[[0, 2, 4, 5]].tolist())) == 4
+
+
+def test_lsh_finds_the_exact_pairs():
+    vectors = _near_copies()[2]
+    vectors = (vectors / np.linalg.norm(vectors, axis = 1)[:, None]
+               ).astype(np.float32)
+    
+    def pairs(found):
+        found = [(i, j) for left, right in found 
+                 for i, j in zip(left.tolist(), right.tolist())]
+        assert len(found) == len(set(found))
+        return set(found)
+    
+    exact = pairs(effort._similar_pairs(vectors, .99))
+    assert len(exact) == 6 * 6
+    assert pairs(effort._lsh_similar_pairs(vectors, .99)) == exact
+    assert pairs(effort._lsh_similar_pairs(vectors, .99, block_size = 3,
+                                           lsh_bits = 4)) == exact
+
+
+def test_minhash_threshold():
+    texts = _near_copies()[1]
+    hashes, offsets = effort._text_shingles(texts)
+    signatures = effort._minhash_signatures(hashes, offsets)
+    
+    def pairs(jaccard_amt, **kwargs):
+        found = [(i, j) for left, right in effort._minhash_similar_pairs(
+                                               signatures, 
+                                               jaccard_amt,
+                                               shingles = (hashes, offsets),
+                                               **kwargs)
+                 for i, j in zip(left.tolist(), right.tolist())]
+        assert len(found) == len(set(found))
+        return set(found)
+    
+    every = [(i, j) 
+             for i in range(len(texts)) 
+             for j in range(i + 1, len(texts))]
+    left, right = np.array(every).T
+    jaccard = effort._shingle_jaccard(hashes, offsets, left, right)
+    assert np.allclose(jaccard[jaccard > 0], 9 / 11)
+    
+    exact = set(p for p, j in zip(every, jaccard) if j >= .8)
+    assert len(exact) == 6 * 6
+    assert pairs(.8) == exact
+    assert pairs(.8, minhash_bands = 64, block_size = 1) == exact
+    assert pairs(.85) == set()
+
+
+@pytest.mark.parametrize('method', ['lsh', 'minhash'])
+def test_methods_match_exact(method):
+    ids, texts, vectors = _near_copies()
+    exact = effort.remove_duplicates(_tweets(ids, texts, vectors))
+    found = effort.remove_duplicates(_tweets(ids, texts, vectors), 
+                                     method = method)
+    
+    assert sorted(exact[0]['tweet_id']) == ids[::4]
+    assert sorted(found[0]['tweet_id']) == sorted(exact[0]['tweet_id'])
+    assert sorted(found[1]['tweet_id']) == sorted(exact[1]['tweet_id'])
+    assert _groups(found[2]) == _groups(exact[2])
+
+
+def test_lsh_recall_report():
+    ids, texts, vectors = _near_copies()
+    report = effort.lsh_recall_report(_tweets(ids, texts, vectors),
+                                      lsh_tables = (4, 8),
+                                      lsh_bits = (8,))
+    assert report[['lsh_tables', 'lsh_bits']].values.tolist() == [[4, 8], 
+                                                                  [8, 8]]
+    assert (report['exact_pairs'] == 6 * 6).all()
+    assert (report['recall'] == 1.0).all()
@@ -0,0 +1,55 @@
+"""
+Regression checks for effort.remove_duplicates_stream(). No spaCy needed:
+the tweets come already parsed, as CompactDocs with made-up vectors.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import effort
+
+
+def _tweets(ids, texts, vectors, rt_ids):
+    n = len(ids)
+    vectors = np.asarray(vectors, dtype = np.float32)
+    parse = effort.CompactParse(np.zeros(n, dtype = np.uint64),
+                                np.zeros(n, dtype = np.uint8),
+                                np.arange(n + 1, dtype = np.int64),
+                                vectors,
+                                (vectors != 0).any(axis = 1).astype(np.int32),
+                                dict())
+    return pd.DataFrame({'tweet_id' : ids,
+                         'tweet_text' : texts,
+                         'tweet_created_at' : pd.to_datetime(
+                                 [1.5e9 + int(i) for i in ids], unit = 's'),
+                         'rt_tweet_id' : rt_ids,
+                         'parsed' : [effort.CompactDoc(parse, i) for i in range(n)]})
+
+
+@pytest.mark.parametrize('method', ['exact', 'lsh'])
+def test_zero_vector_exact_duplicates(tmp_path, method):
+    # retweets of a tweet that is only a link have nothing to make a vector 
+    # of, but are still exact duplicates of each other
+    link = "RT @a: https://t.co/x"
+    first = _tweets(['1', '2', '3'],
+                    [link, link, "cats and dogs"],
+                    [[0, 0], [0, 0], [1, 0]],
+                    ['9', '9', None])
+    second = _tweets(['4', '5', '6'],
+                     [link, "cats and dogs", "something else"],
+                     [[0, 0], [1, 0], [0, 1]],
+                     ['9', None, None])
+    
+    reduced, removed, dup = effort.remove_duplicates_stream(
+                                first, str(tmp_path / 'state'), method = method)
+    assert sorted(reduced['tweet_id']) == ['3']
+    assert sorted(removed['tweet_id']) == ['1', '2']
+    assert dup['tweet_id'].tolist() == ['1', '2']
+    assert dup.index.tolist() == ['1', '1']
+    assert len(effort.DuplicateState(str(tmp_path / 'state'))) == 1
+    
+    reduced, removed, dup = effort.remove_duplicates_stream(
+                                second, str(tmp_path / 'state'), method = method)
+    assert sorted(reduced['tweet_id']) == ['6']
+    assert sorted(removed['tweet_id']) == ['4', '5']
+    assert dict(zip(dup['tweet_id'], dup.index)) == {'5' : '3'}
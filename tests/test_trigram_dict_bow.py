@@ -0,0 +1,94 @@
+"""
+Checks that the ways effort.trigram_dict_bow() can build its dictionary and
+corpora (sharded across processes, inline, as CSR) give the same result as
+the plain serial build.
+"""
+import filecmp
+
+import numpy as np
+import pytest
+from gensim.corpora import Dictionary, MmCorpus
+
+import effort
+
+
+def _docs(n = 300, seed = 0):
+    # Zipf-ish words, with a few empty documents
+    rng = np.random.default_rng(seed)
+    vocab = ["tok" + chr(97 + i // 26) + chr(97 + i % 26) for i in range(200)]
+    weights = 1 / np.arange(1, len(vocab) + 1)
+    weights /= weights.sum()
+    return [list(rng.choice(vocab, size = rng.integers(0, 15), p = weights))
+            for _ in range(n)]
+
+
+def _build(path, monkeypatch, **kwargs):
+    path.mkdir()
+    monkeypatch.chdir(path)
+    with open('trigram_transformed.txt', 'w', encoding = 'utf-8') as file:
+        for doc in _docs():
+            file.write(" ".join(doc) + "\n")
+    splits = {'train' : [0] * 200, 'test' : [0] * 50, 'hold' : [0] * 50}
+    return effort.trigram_dict_bow([2, .5], splits, **kwargs)
+
+
+def test_merge_dictionaries():
+    docs = _docs()
+    whole = Dictionary(docs)
+    merged, id_maps = effort._merge_dictionaries(
+                          [Dictionary(docs[:100]), 
+                           Dictionary(docs[100:120]),
+                           Dictionary(docs[120:])])
+    
+    assert id_maps[0] is None and len(id_maps) == 3
+    assert merged.token2id == whole.token2id
+    assert merged.dfs == whole.dfs
+    assert merged.cfs == whole.cfs
+    assert merged.num_docs == whole.num_docs
+    assert merged.num_pos == whole.num_pos
+
+
+def test_mm_writer_matches_serialize(tmp_path):
+    dictionary = Dictionary(_docs())
+    bows = [dictionary.doc2bow(doc) for doc in _docs()]
+    MmCorpus.serialize(str(tmp_path / 'serialized.mm'), bows)
+    writer = effort._MmSplitWriter(str(tmp_path / 'written.mm'))
+    for bow in bows:
+        writer.add(bow)
+    writer.close()
+    
+    assert filecmp.cmp(tmp_path / 'serialized.mm', tmp_path / 'written.mm',
+                       shallow = False)
+    assert filecmp.cmp(tmp_path / 'serialized.mm.index', 
+                       tmp_path / 'written.mm.index',
+                       shallow = False)
+
+
+@pytest.mark.parametrize('inline_dictionary', [False, True])
+def test_sharded_matches_serial(tmp_path, monkeypatch, inline_dictionary):
+    serial = _build(tmp_path / 'serial', monkeypatch)
+    sharded = _build(tmp_path / 'sharded', monkeypatch, 
+                     processes = 2, 
+                     inline_dictionary = inline_dictionary)
+    
+    serial_dict = Dictionary.load(str(tmp_path / 'serial' / serial[0]))
+    sharded_dict = Dictionary.load(str(tmp_path / 'sharded' / sharded[0]))
+    assert sharded_dict.token2id == serial_dict.token2id
+    assert sharded_dict.dfs == serial_dict.dfs
+    for name in serial[1]:
+        for ending in ('', '.index'):
+            assert filecmp.cmp(tmp_path / 'serial' / (name + ending),
+                               tmp_path / 'sharded' / (name + ending),
+                               shallow = False)
+
+
+def test_csr_matches_mm(tmp_path, monkeypatch):
+    mm = _build(tmp_path / 'mm', monkeypatch)
+    csr = _build(tmp_path / 'csr', monkeypatch, corpus_format = 'csr')
+    
+    assert [name.endswith('.csr') for name in csr[1]] == [True] * 3
+    for mm_name, csr_name in zip(mm[1], csr[1]):
+        mm_corpus = effort._load_bow_corpus(str(tmp_path / 'mm' / mm_name))
+        csr_corpus = effort._load_bow_corpus(str(tmp_path / 'csr' / csr_name))
+        assert ([[(i, float(count)) for i, count in bow] for bow in csr_corpus]
+                == [list(bow) for bow in mm_corpus])
@@ -0,0 +1,50 @@
+"""
+Checks effort.twitter_to_datetime() against the pd.to_datetime(format = ...)
+call it replaces.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import effort
+
+
+def _old(values):
+    return pd.to_datetime(values, format = effort._TWITTER_DATE_FORMAT)
+
+
+def test_same_as_pd_to_datetime():
+    rng = np.random.default_rng(0)
+    stamps = pd.to_datetime(rng.integers(0, 4.1e9, size = 2000), unit = 's')
+    values = pd.Series(stamps.strftime("%a %b %d %H:%M:%S +0000 %Y"))
+    # every day of a leap year and of a year that isn't one
+    days = pd.date_range('2016-01-01', '2017-12-31 12:00', freq = '12h')
+    values = pd.concat([values, 
+                        pd.Series(days.strftime("%a %b %d %H:%M:%S +0000 %Y")),
+                        pd.Series([None])], 
+                       ignore_index = True)
+    
+    new = effort.twitter_to_datetime(values)
+    old = _old(values).astype('datetime64[ns]')
+    
+    assert new.index.equals(values.index)
+    assert new.isna().equals(old.isna())
+    assert (new[old.notna()] == old[old.notna()]).all()
+
+
+@pytest.mark.parametrize('value', ['Thu Feb 30 10:00:00 +0000 2023',
+                                   'Sun Apr 31 10:00:00 +0000 2023',
+                                   'Wed Feb 29 10:00:00 +0000 2023',
+                                   'Thu Feb 29 10:00:00 +0000 2100',
+                                   'Mon Jan 32 10:00:00 +0000 2023',
+                                   'Mon Jan 00 10:00:00 +0000 2023'])
+def test_impossible_dates_raise(value):
+    with pytest.raises(ValueError):
+        _old([value])
+    with pytest.raises(ValueError):
+        effort.twitter_to_datetime(['Tue Oct 31 14:32:40 +0000 2017', value])
+
+
+def test_leap_day():
+    values = ['Sat Feb 29 10:00:00 +0000 2020', 'Tue Feb 29 10:00:00 +0000 2000']
+    assert (effort.twitter_to_datetime(values) == _old(values)).all()